@@ -14,8 +14,8 @@ import os
 
 import config
 from database import pdf_manager, question_manager, save_manager, stats_manager
-from pdf_processor import PDFProcessor, PDFManager as PDFMgr, allowed_file, save_uploaded_file
-from question_generator import QuestionGenerator, process_pdf_and_generate_questions
+from pdf_processor import PDFProcessor, PDFManager as PDFMgr, allowed_file, save_uploaded_file, to_json
+from question_generator import get_generator, process_pdf_and_generate_questions
 from game_engine import GameEngine, validate_pdf_ready
 from stats_exporter import StatsExporter, LearningAnalyzer, export_stats_for_pdf
 
@@ -152,14 +152,15 @@ def upload_pdf():
         pdf_mgr = PDFMgr()
         result = pdf_mgr.process_and_store_pdf(filepath)
 
-        return jsonify({
+        # Encode with orjson (when available) and send the bytes as-is
+        return app.response_class(to_json({
             'success': True,
             'pdf_id': result['pdf_id'],
             'title': result['title'],
             'num_pages': result['num_pages'],
             'estimated_questions': result['estimated_questions'],
             'message': 'PDF uploaded successfully'
-        })
+        }), mimetype='application/json')
 
     except Exception as e:
         logger.error(f"Upload error: {str(e)}")
@@ -223,7 +224,7 @@ def estimate_cost(pdf_id):
 
         num_questions = request.args.get('num_questions', config.QUESTIONS_PER_BATCH, type=int)
 
-        generator = QuestionGenerator()
+        generator = get_generator()
         estimate = generator.estimate_cost(pdf_info['total_chars'], num_questions)
 
         return jsonify({
@@ -487,7 +488,7 @@ def get_stats(pdf_id):
 def export_stats(pdf_id, format):
     """Export statistics in specified format"""
     try:
-        if format not in ['json', 'csv', 'markdown', 'all']:
+        if format not in ['json', 'csv', 'markdown', 'parquet', 'all']:
             return jsonify({'error': 'Invalid format'}), 400
 
         result = export_stats_for_pdf(pdf_id, format)
@@ -15,6 +15,28 @@ XAI_API_KEY = os.environ.get('XAI_API_KEY', '')
 GROK_MODEL = 'grok-2-latest'  # or 'grok-2-latest' for more advanced
 MAX_TOKENS = 4096
 TEMPERATURE = 0.7
+MAX_CONCURRENT_REQUESTS = int(os.environ.get('MAX_CONCURRENT_REQUESTS', 10))  # Parallel chunk requests
+API_MAX_RETRIES = 3  # SDK retries with exponential backoff (429s, timeouts, 5xx)
+API_MAX_RETRIES_ASYNC = 0  # Async requests are retried by RateLimitedExecutor instead
+API_REQUESTS_PER_MINUTE = int(os.environ.get('API_REQUESTS_PER_MINUTE', 60))  # Account rate limits,
+API_TOKENS_PER_MINUTE = int(os.environ.get('API_TOKENS_PER_MINUTE', 100_000))  # used to pace requests
+RATE_LIMIT_MAX_ATTEMPTS = 5  # Attempts per chunk request (429s, timeouts, 5xx)
+API_MAX_CONNECTIONS = 32  # HTTP connection pool size (kept alive between requests)
+
+# Cache raw API responses for identical requests (same model, prompt and parameters)
+RESPONSE_CACHE_ENABLED = True
+RESPONSE_CACHE_TTL = 30 * 24 * 3600  # Seconds
+
+# Semantic cache: reuse questions of near-duplicate chunks (needs sentence-transformers + faiss)
+SEMANTIC_CACHE_ENABLED = True
+SEMANTIC_CACHE_MODEL = 'sentence-transformers/all-MiniLM-L6-v2'
+SEMANTIC_CACHE_THRESHOLD = 0.93  # Cosine similarity above which a chunk counts as a duplicate
+
+# Batch API (offline generation: separate rate limits, discounted pricing)
+BATCH_COMPLETION_WINDOW = '24h'
+BATCH_POLL_INTERVAL = 5  # Seconds before the first status check
+BATCH_POLL_MAX_INTERVAL = 300  # Backoff cap between status checks
+BATCH_WAIT_TIMEOUT = 25 * 3600  # Seconds wait_for_batch waits (completion window plus margin)
 
 # Legacy Claude support (optional - can still use Claude if preferred)
 ANTHROPIC_API_KEY = os.environ.get('ANTHROPIC_API_KEY', '')
@@ -29,6 +51,7 @@ DATA_DIR = BASE_DIR / 'data'
 PDF_DIR = DATA_DIR / 'pdfs'
 EXPORT_DIR = DATA_DIR / 'exports'
 DATABASE_PATH = DATA_DIR / 'questions.db'
+SEMANTIC_CACHE_DIR = DATA_DIR / 'semcache'  # Created on first save
 
 # Create directories if they don't exist
 for directory in [DATA_DIR, PDF_DIR, EXPORT_DIR]:
@@ -246,6 +269,28 @@ PORT = int(os.environ.get('PORT', 5000))
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
 ALLOWED_EXTENSIONS = {'pdf'}
 
+# ═══════════════════════════════════════════════════════════════════
+# 📄 PDF PROCESSING CONFIGURATION
+# ═══════════════════════════════════════════════════════════════════
+
+# Text extraction backend: 'pymupdf' (fast, C-backed) or 'pdfplumber' (slower, layout-aware)
+# Falls back to pdfplumber automatically if PyMuPDF is not installed
+PDF_TEXT_BACKEND = os.environ.get('PDF_TEXT_BACKEND', 'pymupdf').lower()
+
+# Parallel page extraction (worker processes; small PDFs stay in-process)
+PDF_EXTRACTION_WORKERS = int(os.environ.get('PDF_EXTRACTION_WORKERS', os.cpu_count() or 1))
+PDF_PARALLEL_MIN_PAGES = 8  # Below this page count, extract sequentially
+
+# Cache extraction results on disk, keyed on file path, size and mtime
+PDF_CACHE_ENABLED = True
+PDF_CACHE_DIR = DATA_DIR / 'pdf_cache'  # Created on first save
+PDF_CACHE_KEEP = 50  # Newest extraction results kept
+
+# Cache gathered export stats on disk, keyed on a fingerprint of the PDF's stats
+STATS_CACHE_ENABLED = True
+STATS_CACHE_DIR = DATA_DIR / 'stats_cache'  # Created on first save
+STATS_CACHE_KEEP = 10  # Newest cache files kept per PDF
+
 # ═══════════════════════════════════════════════════════════════════
 # 🔍 OCR CONFIGURATION
 # ═══════════════════════════════════════════════════════════════════
@@ -266,6 +311,7 @@ OCR_DPI = 300  # DPI for image extraction (higher = better quality but slower)
 OCR_MIN_CONFIDENCE = 60  # Minimum confidence score (0-100) to accept OCR text
 OCR_PREPROCESSING = True  # Apply image preprocessing (denoise, contrast, etc.)
 OCR_BATCH_SIZE = 5  # Number of pages to process in parallel
+OCR_POOL_WORKERS = int(os.environ.get('OCR_POOL_WORKERS', os.cpu_count() or 1))  # Warm Tesseract processes (ocr_worker.py)
 
 # Image preprocessing options
 OCR_PREPROCESS_OPTIONS = {
@@ -0,0 +1,15 @@
+"""
+Test configuration for Educational Roguelike Game
+Points the database at a temporary file so tests never touch data/questions.db
+"""
+
+import tempfile
+from pathlib import Path
+
+import config
+
+# Must run before database.py is imported (it opens the database at import time)
+config.DATABASE_PATH = Path(tempfile.mkdtemp(prefix='roguelike-test-')) / 'questions.db'
+
+# Installation check script (python test_ocr_installation.py), not a test module
+collect_ignore = ['test_ocr_installation.py']
@@ -5,23 +5,72 @@ Uses SQLite for storing questions, game saves, and statistics
 
 import sqlite3
 import json
+import time
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import Iterable, Iterator, List, Dict, Optional, Tuple
 from contextlib import contextmanager
 import config
 
+# Import orjson if available (faster encoding/decoding of question options)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+
+def _dumps(value) -> str:
+    """Serialize a value to a JSON string for a TEXT column"""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(value).decode('utf-8')
+    return json.dumps(value)
+
+
+def _loads(text: str):
+    """Parse a JSON TEXT column"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+# Question options are stored as TEXT with each option prefixed by the ASCII
+# unit separator, e.g. "\x1fopt1\x1fopt2". The leading separator tells them
+# apart from JSON arrays (older rows, or options that can't use the format).
+# An empty list is stored as JSON, since "\x1f" alone means [''].
+OPTIONS_SEP = '\x1f'
+
+
+def encode_options(options: List[str]) -> str:
+    """Serialize question options for the options column"""
+    if options and all(isinstance(option, str) and OPTIONS_SEP not in option for option in options):
+        return OPTIONS_SEP + OPTIONS_SEP.join(options)
+    return _dumps(options)
+
+
+def decode_options(text: str) -> List[str]:
+    """Parse the options column (separator format or JSON)"""
+    if text.startswith(OPTIONS_SEP):
+        return text[1:].split(OPTIONS_SEP)
+    return _loads(text)
+
 
 class Database:
     """Main database class handling all SQLite operations"""
     def __init__(self, db_path: str = None):
         """Initialize database with path"""
         self.db_path = db_path or str(config.DATABASE_PATH)
+        self.bulk_mode = False  # See bulk_load()
         self.init_database()
     @contextmanager
     def get_connection(self):
         """Context manager for database connections"""
         conn = sqlite3.connect(self.db_path)
         conn.execute("PRAGMA foreign_keys = ON")  
+        if self.bulk_mode:
+            conn.execute("PRAGMA synchronous = OFF")
+            conn.execute("PRAGMA temp_store = MEMORY")
+        else:
+            conn.execute("PRAGMA synchronous = NORMAL")  # Safe with WAL, far fewer fsyncs
         conn.row_factory = sqlite3.Row
         
         try:
@@ -33,16 +82,42 @@ class Database:
         finally:
             conn.close()     
 
+    @contextmanager
+    def bulk_load(self):
+        """
+        Relax durability for one-shot seeding scripts
+
+        Connections opened inside skip fsync (synchronous=OFF) and keep temp data
+        in memory. An application crash is survivable, but an OS crash or power
+        loss meanwhile can corrupt the database file, even in WAL mode, so only
+        use it on data that can be rebuilt (e.g. setup_demo.py).
+
+        The flag lives on this Database, which every manager of the process
+        shares (the global db), so connections opened by other threads during
+        the block are relaxed too.
+        """
+        self.bulk_mode = True
+        try:
+            yield
+        finally:
+            self.bulk_mode = False
+
 
     def init_database(self):
         """Initialize database tables"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
 
-            # ═══════════════════════════════════════════════════════
-            # 📄 PDFs Table
-            # ═══════════════════════════════════════════════════════
-            cursor.execute('''
+            # PRAGMA and whole schema in one script; the schema in one transaction
+            cursor.executescript('''
+                -- WAL lets readers run while a write is being committed (persists in the file)
+                PRAGMA journal_mode = WAL;
+
+                BEGIN;
+
+                -- ═══════════════════════════════════════════════════════
+                -- 📄 PDFs Table
+                -- ═══════════════════════════════════════════════════════
                 CREATE TABLE IF NOT EXISTS pdfs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     filename TEXT NOT NULL,
@@ -53,13 +128,11 @@ class Database:
                     total_chars INTEGER,
                     processed BOOLEAN DEFAULT FALSE,
                     processing_date TIMESTAMP
-                )
-            ''')
+                );
 
-            # ═══════════════════════════════════════════════════════
-            # ❓ Questions Table
-            # ═══════════════════════════════════════════════════════
-            cursor.execute('''
+                -- ═══════════════════════════════════════════════════════
+                -- ❓ Questions Table
+                -- ═══════════════════════════════════════════════════════
                 CREATE TABLE IF NOT EXISTS questions (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     pdf_id INTEGER NOT NULL,
@@ -75,13 +148,11 @@ class Database:
                     times_correct INTEGER DEFAULT 0,
                     last_asked TIMESTAMP,
                     FOREIGN KEY (pdf_id) REFERENCES pdfs(id) ON DELETE CASCADE
-                )
-            ''')
+                );
 
-            # ═══════════════════════════════════════════════════════
-            # 💾 Game Saves Table
-            # ═══════════════════════════════════════════════════════
-            cursor.execute('''
+                -- ═══════════════════════════════════════════════════════
+                -- 💾 Game Saves Table
+                -- ═══════════════════════════════════════════════════════
                 CREATE TABLE IF NOT EXISTS game_saves (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     pdf_id INTEGER NOT NULL,
@@ -98,13 +169,11 @@ class Database:
                     last_played TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     is_active BOOLEAN DEFAULT TRUE,
                     FOREIGN KEY (pdf_id) REFERENCES pdfs(id) ON DELETE CASCADE
-                )
-            ''')
+                );
 
-            # ═══════════════════════════════════════════════════════
-            # 📊 Statistics Table
-            # ═══════════════════════════════════════════════════════
-            cursor.execute('''
+                -- ═══════════════════════════════════════════════════════
+                -- 📊 Statistics Table
+                -- ═══════════════════════════════════════════════════════
                 CREATE TABLE IF NOT EXISTS statistics (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     pdf_id INTEGER NOT NULL,
@@ -117,13 +186,11 @@ class Database:
                     enemies_defeated INTEGER DEFAULT 0,
                     game_completed BOOLEAN DEFAULT FALSE,
                     FOREIGN KEY (pdf_id) REFERENCES pdfs(id) ON DELETE CASCADE
-                )
-            ''')
+                );
 
-            # ═══════════════════════════════════════════════════════
-            # 📝 Answer History Table
-            # ═══════════════════════════════════════════════════════
-            cursor.execute('''
+                -- ═══════════════════════════════════════════════════════
+                -- 📝 Answer History Table
+                -- ═══════════════════════════════════════════════════════
                 CREATE TABLE IF NOT EXISTS answer_history (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     question_id INTEGER NOT NULL,
@@ -135,25 +202,30 @@ class Database:
                     answered_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     FOREIGN KEY (question_id) REFERENCES questions(id) ON DELETE CASCADE,
                     FOREIGN KEY (pdf_id) REFERENCES pdfs(id) ON DELETE CASCADE
-                )
-            ''')
-
-            # Create indexes for better query performance
-            cursor.execute('''
+                );
+
+                -- ═══════════════════════════════════════════════════════
+                -- 💾 API Response Cache Table
+                -- ═══════════════════════════════════════════════════════
+                CREATE TABLE IF NOT EXISTS response_cache (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                );
+
+                -- Create indexes for better query performance
                 CREATE INDEX IF NOT EXISTS idx_questions_pdf
-                ON questions(pdf_id)
-            ''')
-            cursor.execute('''
+                ON questions(pdf_id);
                 CREATE INDEX IF NOT EXISTS idx_questions_difficulty
-                ON questions(difficulty)
-            ''')
-            cursor.execute('''
+                ON questions(difficulty);
                 CREATE INDEX IF NOT EXISTS idx_answer_history_question
-                ON answer_history(question_id)
-            ''')
-            cursor.execute('''
+                ON answer_history(question_id);
                 CREATE INDEX IF NOT EXISTS idx_answer_history_date
-                ON answer_history(answered_date)
+                ON answer_history(answered_date);
+                CREATE INDEX IF NOT EXISTS idx_response_cache_created
+                ON response_cache(created_at);
+
+                COMMIT;
             ''')
 
 
@@ -168,14 +240,16 @@ class PDFManager:
         self.db = db
 
     def add_pdf(self, filename: str, filepath: str, title: str = None,
-                num_pages: int = 0, total_chars: int = 0) -> int:
-        """Add a new PDF to the database"""
+                num_pages: int = 0, total_chars: int = 0, processed: bool = False) -> int:
+        """Add a new PDF to the database (processed=True saves a later mark_processed)"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO pdfs (filename, filepath, title, num_pages, total_chars)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (filename, filepath, title or filename, num_pages, total_chars))
+                INSERT INTO pdfs (filename, filepath, title, num_pages, total_chars,
+                                  processed, processing_date)
+                VALUES (?, ?, ?, ?, ?, ?, CASE WHEN ? THEN CURRENT_TIMESTAMP END)
+            ''', (filename, filepath, title or filename, num_pages, total_chars,
+                  processed, processed))
             return cursor.lastrowid
 
     def mark_processed(self, pdf_id: int):
@@ -196,6 +270,14 @@ class PDFManager:
             row = cursor.fetchone()
             return dict(row) if row else None
 
+    def get_pdf_title(self, pdf_id: int) -> Optional[str]:
+        """Get only the title of a PDF (None if it doesn't exist)"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT title FROM pdfs WHERE id = ?', (pdf_id,))
+            row = cursor.fetchone()
+            return row['title'] if row else None
+
     def get_all_pdfs(self) -> List[Dict]:
         """Get all PDFs"""
         with self.db.get_connection() as conn:
@@ -219,6 +301,15 @@ class PDFManager:
 class QuestionManager:
     """Handles question-related database operations"""
 
+    # One literal for every insert path, so each connection compiles it once
+    # and reuses it from its statement cache
+    _INSERT_SQL = '''
+        INSERT INTO questions
+        (pdf_id, question_text, question_type, correct_answer, options,
+         explanation, topic, difficulty)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+
     def __init__(self, db: Database):
         self.db = db
 
@@ -229,34 +320,93 @@ class QuestionManager:
         """Add a new question to the database"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            options_json = json.dumps(options) if options else None
-            cursor.execute('''
-                INSERT INTO questions
-                (pdf_id, question_text, question_type, correct_answer, options,
-                 explanation, topic, difficulty)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (pdf_id, question_text, question_type, correct_answer,
-                  options_json, explanation, topic, difficulty))
+            options_text = encode_options(options) if options else None
+            cursor.execute(self._INSERT_SQL, (pdf_id, question_text, question_type, correct_answer,
+                                              options_text, explanation, topic, difficulty))
             return cursor.lastrowid
 
-    def add_questions_batch(self, questions: List[Dict]) -> int:
-        """Add multiple questions at once"""
+    def add_questions_batch(self, questions: Iterable[Dict]) -> int:
+        """Add multiple questions at once (one executemany, one commit)"""
+        rows = (
+            (q['pdf_id'], q['question_text'], q['question_type'],
+             q['correct_answer'],
+             encode_options(q['options']) if q.get('options') else None,
+             q.get('explanation'), q.get('topic'), q.get('difficulty', 'medium'))
+            for q in questions
+        )
+        return self._insert_rows(rows)
+
+    def add_questions_many(self, pdf_id: int, questions: Iterable[Dict]) -> int:
+        """Add multiple questions of one PDF at once (questions don't need a pdf_id key)"""
+        return self._insert_rows(self._question_rows(pdf_id, questions))
+
+    def bulk_seed(self, pdf_id: int, questions: Iterable[Dict]) -> int:
+        """
+        Seed many questions of one PDF, rebuilding the questions indexes once
+
+        The indexes are dropped, the rows inserted and the indexes recreated in
+        one transaction, so a failure leaves the table and indexes as they were.
+        """
+        return self.bulk_seed_rows(self._question_rows(pdf_id, questions))
+
+    def bulk_seed_rows(self, rows: Iterable[Tuple]) -> int:
+        """
+        Like bulk_seed, for rows already in INSERT order: (pdf_id, question_text,
+        question_type, correct_answer, encode_options(options), explanation, topic, difficulty)
+        """
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            count = 0
-            for q in questions:
-                options_json = json.dumps(q.get('options')) if q.get('options') else None
-                cursor.execute('''
-                    INSERT INTO questions
-                    (pdf_id, question_text, question_type, correct_answer, options,
-                     explanation, topic, difficulty)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                ''', (q['pdf_id'], q['question_text'], q['question_type'],
-                      q['correct_answer'], options_json, q.get('explanation'),
-                      q.get('topic'), q.get('difficulty', 'medium')))
-                count += 1
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.execute('''
+                SELECT name, sql FROM sqlite_master
+                WHERE type = 'index' AND tbl_name = 'questions' AND sql IS NOT NULL
+            ''')
+            indexes = cursor.fetchall()
+
+            for index in indexes:
+                cursor.execute(f'DROP INDEX IF EXISTS "{index["name"]}"')
+            cursor.executemany(self._INSERT_SQL, rows)
+            count = cursor.rowcount
+            for index in indexes:
+                cursor.execute(index['sql'])
             return count
 
+    @staticmethod
+    def validate_records(records: Iterable[Dict]):
+        """
+        Check question records once before a bulk insert (the insert paths don't)
+
+        Raises ValueError naming the first invalid record (1-based).
+        """
+        for i, q in enumerate(records, 1):
+            if not q.get('question_text') or not q.get('correct_answer'):
+                raise ValueError(f"Question {i}: question_text and correct_answer are required")
+            if q.get('question_type') not in ('multiple_choice', 'true_false'):
+                raise ValueError(f"Question {i}: invalid question_type {q.get('question_type')!r}")
+            if q.get('difficulty', 'medium') not in config.DIFFICULTY_LEVELS:
+                raise ValueError(f"Question {i}: invalid difficulty {q.get('difficulty')!r}")
+            options = q.get('options')
+            if not isinstance(options, list) or q['correct_answer'] not in options:
+                raise ValueError(f"Question {i}: correct_answer must be one of its options")
+
+    @staticmethod
+    def _question_rows(pdf_id: int, questions: Iterable[Dict]) -> List[Tuple]:
+        """Build INSERT rows for questions of one PDF (options serialized once here)"""
+        return [
+            (pdf_id, q['question_text'], q['question_type'], q['correct_answer'],
+             encode_options(q['options']) if q.get('options') else None,
+             q.get('explanation'), q.get('topic'), q.get('difficulty', 'medium'))
+            for q in questions
+        ]
+
+    def _insert_rows(self, rows: Iterable[Tuple]) -> int:
+        """Insert question rows with one executemany in one transaction"""
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("BEGIN IMMEDIATE")
+            cursor.executemany(self._INSERT_SQL, rows)
+            return cursor.rowcount
+
     def get_question(self, question_id: int) -> Optional[Dict]:
         """Get a specific question by ID"""
         with self.db.get_connection() as conn:
@@ -266,7 +416,7 @@ class QuestionManager:
             if row:
                 question = dict(row)
                 if question['options']:
-                    question['options'] = json.loads(question['options'])
+                    question['options'] = decode_options(question['options'])
                 return question
             return None
 
@@ -307,7 +457,7 @@ class QuestionManager:
             if row:
                 question = dict(row)
                 if question['options']:
-                    question['options'] = json.loads(question['options'])
+                    question['options'] = decode_options(question['options'])
                 return question
             return None
 
@@ -449,6 +599,23 @@ class GameSaveManager:
 class StatisticsManager:
     """Handles statistics and answer history"""
 
+    # Column names of the topic performance CSV export
+    TOPIC_PERFORMANCE_HEADER = ('Topic', 'Attempts', 'Correct', 'Accuracy (%)')
+
+    # Topic performance rows ready for CSV (accuracy formatted by SQLite)
+    _TOPIC_ROWS_SQL = '''
+        SELECT
+            q.topic,
+            COUNT(ah.id) as attempts,
+            SUM(CASE WHEN ah.is_correct THEN 1 ELSE 0 END) as correct,
+            printf('%.1f', AVG(CASE WHEN ah.is_correct THEN 100.0 ELSE 0 END)) as accuracy
+        FROM answer_history ah
+        JOIN questions q ON ah.question_id = q.id
+        WHERE ah.pdf_id = ?
+        GROUP BY q.topic
+        ORDER BY AVG(CASE WHEN ah.is_correct THEN 100.0 ELSE 0 END) DESC
+    '''
+
     def __init__(self, db: Database):
         self.db = db
 
@@ -484,106 +651,218 @@ class StatisticsManager:
 
     def get_overall_stats(self, pdf_id: int) -> Dict:
         """Get overall statistics for a PDF"""
+        with self.db.get_connection() as conn:
+            return self._overall_stats(conn.cursor(), pdf_id)
+
+    def get_topic_performance(self, pdf_id: int) -> List[Dict]:
+        """Get performance broken down by topic"""
+        with self.db.get_connection() as conn:
+            return self._topic_performance(conn.cursor(), pdf_id)
+
+    def iter_topic_performance_rows(self, pdf_id: int, batch_size: int = 1000) -> Iterator[Tuple]:
+        """Yield (topic, attempts, correct, accuracy) tuples ready for CSV, accuracy pre-formatted as '%.1f'"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute(self._TOPIC_ROWS_SQL, (pdf_id,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from map(tuple, rows)
 
-            # Overall accuracy
-            cursor.execute('''
-                SELECT
-                    COUNT(*) as total_answers,
-                    SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) as correct_answers
-                FROM answer_history WHERE pdf_id = ?
-            ''', (pdf_id,))
-            accuracy_row = cursor.fetchone()
+    def get_weak_areas(self, pdf_id: int, threshold: float = 60.0) -> List[Dict]:
+        """Identify topics/questions where user struggles"""
+        with self.db.get_connection() as conn:
+            return self._weak_areas(conn.cursor(), pdf_id, threshold)
 
-            # Total time played
-            cursor.execute('''
-                SELECT SUM(time_played_seconds) as total_time
-                FROM statistics WHERE pdf_id = ?
-            ''', (pdf_id,))
-            time_row = cursor.fetchone()
+    def get_recent_activity(self, pdf_id: int, limit: int = 20) -> List[Dict]:
+        """Get recent answer history"""
+        with self.db.get_connection() as conn:
+            return self._recent_activity(conn.cursor(), pdf_id, limit)
 
-            # Total score
+    def get_export_fingerprint(self, pdf_id: int) -> Tuple:
+        """
+        Cheap summary that changes whenever anything a stats export reads changes
+
+        Answers are append-only (count, last id and last answer time), sessions are
+        updated in place (their sums), questions track times_asked.
+        """
+        with self.db.get_connection() as conn:
+            cursor = conn.cursor()
             cursor.execute('''
-                SELECT SUM(total_score) as total_score
-                FROM statistics WHERE pdf_id = ?
-            ''', (pdf_id,))
-            score_row = cursor.fetchone()
+                SELECT
+                    a.answers, a.last_answer_id, a.last_answer_date,
+                    s.sessions, s.total_time, s.total_score, s.completed_games,
+                    q.questions, q.last_question_id, q.times_asked,
+                    p.title, p.filename, p.num_pages, p.upload_date
+                FROM
+                    (SELECT COUNT(*) as answers, MAX(id) as last_answer_id,
+                            MAX(answered_date) as last_answer_date
+                     FROM answer_history WHERE pdf_id = ?) a,
+                    (SELECT COUNT(*) as sessions, SUM(time_played_seconds) as total_time,
+                            SUM(total_score) as total_score,
+                            SUM(CASE WHEN game_completed = TRUE THEN 1 ELSE 0 END) as completed_games
+                     FROM statistics WHERE pdf_id = ?) s,
+                    (SELECT COUNT(*) as questions, MAX(id) as last_question_id,
+                            SUM(times_asked) as times_asked
+                     FROM questions WHERE pdf_id = ?) q
+                LEFT JOIN pdfs p ON p.id = ?
+            ''', (pdf_id, pdf_id, pdf_id, pdf_id))
+            return tuple(cursor.fetchone())
+
+    def get_export_bundle(self, pdf_id: int, recent_limit: int = 20) -> Dict:
+        """
+        Everything a stats export needs, read on one connection in one transaction
+
+        Returns:
+            Dict with pdf_info, overall, topics, weak, recent, question_count
+            and questions_by_topic
+        """
+        with self.db.get_connection() as conn:
+            conn.execute("PRAGMA cache_size = -20000")  # ~20 MB
+            conn.execute("BEGIN")  # Same snapshot for every query
+            cursor = conn.cursor()
+
+            cursor.execute('SELECT * FROM pdfs WHERE id = ?', (pdf_id,))
+            pdf_row = cursor.fetchone()
 
-            # Games completed
             cursor.execute('''
-                SELECT COUNT(*) as completed_games
-                FROM statistics WHERE pdf_id = ? AND game_completed = TRUE
+                SELECT topic, COUNT(*) as count
+                FROM questions
+                WHERE pdf_id = ?
+                GROUP BY topic
             ''', (pdf_id,))
-            games_row = cursor.fetchone()
-
-            total = accuracy_row['total_answers'] or 0
-            correct = accuracy_row['correct_answers'] or 0
+            questions_by_topic = {row['topic']: row['count'] for row in cursor.fetchall()}
 
             return {
-                'total_answers': total,
-                'correct_answers': correct,
-                'accuracy': (correct / total * 100) if total > 0 else 0,
-                'total_time_seconds': time_row['total_time'] or 0,
-                'total_score': score_row['total_score'] or 0,
-                'completed_games': games_row['completed_games'] or 0
+                'pdf_info': dict(pdf_row) if pdf_row else None,
+                'overall': self._overall_stats(cursor, pdf_id),
+                'topics': self._topic_performance(cursor, pdf_id),
+                'weak': self._weak_areas(cursor, pdf_id),
+                'recent': self._recent_activity(cursor, pdf_id, recent_limit),
+                'question_count': sum(questions_by_topic.values()),
+                'questions_by_topic': questions_by_topic
             }
 
-    def get_topic_performance(self, pdf_id: int) -> List[Dict]:
-        """Get performance broken down by topic"""
-        with self.db.get_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT
-                    q.topic,
-                    COUNT(ah.id) as attempts,
-                    SUM(CASE WHEN ah.is_correct THEN 1 ELSE 0 END) as correct,
-                    AVG(CASE WHEN ah.is_correct THEN 100.0 ELSE 0 END) as accuracy
-                FROM answer_history ah
-                JOIN questions q ON ah.question_id = q.id
-                WHERE ah.pdf_id = ?
-                GROUP BY q.topic
-                ORDER BY accuracy DESC
-            ''', (pdf_id,))
-            return [dict(row) for row in cursor.fetchall()]
+    @staticmethod
+    def _overall_stats(cursor: sqlite3.Cursor, pdf_id: int) -> Dict:
+        """Overall accuracy, time, score and completed games of a PDF"""
+        cursor.execute('''
+            SELECT
+                COUNT(*) as total_answers,
+                SUM(CASE WHEN is_correct THEN 1 ELSE 0 END) as correct_answers
+            FROM answer_history WHERE pdf_id = ?
+        ''', (pdf_id,))
+        accuracy_row = cursor.fetchone()
+
+        # Time played, score and games completed in one pass over the sessions
+        cursor.execute('''
+            SELECT
+                SUM(time_played_seconds) as total_time,
+                SUM(total_score) as total_score,
+                SUM(CASE WHEN game_completed = TRUE THEN 1 ELSE 0 END) as completed_games
+            FROM statistics WHERE pdf_id = ?
+        ''', (pdf_id,))
+        session_row = cursor.fetchone()
+
+        total = accuracy_row['total_answers'] or 0
+        correct = accuracy_row['correct_answers'] or 0
+
+        return {
+            'total_answers': total,
+            'correct_answers': correct,
+            'accuracy': (correct / total * 100) if total > 0 else 0,
+            'total_time_seconds': session_row['total_time'] or 0,
+            'total_score': session_row['total_score'] or 0,
+            'completed_games': session_row['completed_games'] or 0
+        }
+
+    @staticmethod
+    def _topic_performance(cursor: sqlite3.Cursor, pdf_id: int) -> List[Dict]:
+        """Attempts, correct answers and accuracy per topic"""
+        cursor.execute('''
+            SELECT
+                q.topic,
+                COUNT(ah.id) as attempts,
+                SUM(CASE WHEN ah.is_correct THEN 1 ELSE 0 END) as correct,
+                AVG(CASE WHEN ah.is_correct THEN 100.0 ELSE 0 END) as accuracy
+            FROM answer_history ah
+            JOIN questions q ON ah.question_id = q.id
+            WHERE ah.pdf_id = ?
+            GROUP BY q.topic
+            ORDER BY accuracy DESC
+        ''', (pdf_id,))
+        return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _weak_areas(cursor: sqlite3.Cursor, pdf_id: int, threshold: float = 60.0) -> List[Dict]:
+        """Topic/difficulty pairs answered below threshold accuracy"""
+        cursor.execute('''
+            SELECT
+                q.topic,
+                q.difficulty,
+                COUNT(ah.id) as attempts,
+                SUM(CASE WHEN ah.is_correct THEN 1 ELSE 0 END) as correct,
+                AVG(CASE WHEN ah.is_correct THEN 100.0 ELSE 0 END) as accuracy
+            FROM answer_history ah
+            JOIN questions q ON ah.question_id = q.id
+            WHERE ah.pdf_id = ? AND q.times_asked >= 3
+            GROUP BY q.topic, q.difficulty
+            HAVING accuracy < ?
+            ORDER BY accuracy ASC
+        ''', (pdf_id, threshold))
+        return [dict(row) for row in cursor.fetchall()]
+
+    @staticmethod
+    def _recent_activity(cursor: sqlite3.Cursor, pdf_id: int, limit: int = 20) -> List[Dict]:
+        """Latest answers with their question text, topic and difficulty"""
+        cursor.execute('''
+            SELECT
+                ah.*,
+                q.question_text,
+                q.topic,
+                q.difficulty
+            FROM answer_history ah
+            JOIN questions q ON ah.question_id = q.id
+            WHERE ah.pdf_id = ?
+            ORDER BY ah.answered_date DESC
+            LIMIT ?
+        ''', (pdf_id, limit))
+        return [dict(row) for row in cursor.fetchall()]
 
-    def get_weak_areas(self, pdf_id: int, threshold: float = 60.0) -> List[Dict]:
-        """Identify topics/questions where user struggles"""
+
+# ═══════════════════════════════════════════════════════════════════
+# 💾 API RESPONSE CACHE
+# ═══════════════════════════════════════════════════════════════════
+
+class ResponseCache:
+    """Exact-match cache of raw API responses, keyed by a hash of the request"""
+
+    def __init__(self, db: Database, ttl: float = None):
+        self.db = db
+        self.ttl = ttl if ttl is not None else config.RESPONSE_CACHE_TTL
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response (None if missing or older than the TTL)"""
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT
-                    q.topic,
-                    q.difficulty,
-                    COUNT(ah.id) as attempts,
-                    SUM(CASE WHEN ah.is_correct THEN 1 ELSE 0 END) as correct,
-                    AVG(CASE WHEN ah.is_correct THEN 100.0 ELSE 0 END) as accuracy
-                FROM answer_history ah
-                JOIN questions q ON ah.question_id = q.id
-                WHERE ah.pdf_id = ? AND q.times_asked >= 3
-                GROUP BY q.topic, q.difficulty
-                HAVING accuracy < ?
-                ORDER BY accuracy ASC
-            ''', (pdf_id, threshold))
-            return [dict(row) for row in cursor.fetchall()]
+            cursor.execute(
+                'SELECT response FROM response_cache WHERE key = ? AND created_at >= ?',
+                (key, time.time() - self.ttl)
+            )
+            row = cursor.fetchone()
+            return row['response'] if row else None
 
-    def get_recent_activity(self, pdf_id: int, limit: int = 20) -> List[Dict]:
-        """Get recent answer history"""
+    def set(self, key: str, response: str):
+        """Store a response, replacing any previous entry for the key and dropping expired ones"""
+        now = time.time()
         with self.db.get_connection() as conn:
             cursor = conn.cursor()
+            cursor.execute('DELETE FROM response_cache WHERE created_at < ?', (now - self.ttl,))
             cursor.execute('''
-                SELECT
-                    ah.*,
-                    q.question_text,
-                    q.topic,
-                    q.difficulty
-                FROM answer_history ah
-                JOIN questions q ON ah.question_id = q.id
-                WHERE ah.pdf_id = ?
-                ORDER BY ah.answered_date DESC
-                LIMIT ?
-            ''', (pdf_id, limit))
-            return [dict(row) for row in cursor.fetchall()]
+                INSERT OR REPLACE INTO response_cache (key, response, created_at)
+                VALUES (?, ?, ?)
+            ''', (key, response, now))
 
 
 # ═══════════════════════════════════════════════════════════════════
@@ -596,3 +875,4 @@ pdf_manager = PDFManager(db)
 question_manager = QuestionManager(db)
 save_manager = GameSaveManager(db)
 stats_manager = StatisticsManager(db)
+response_cache = ResponseCache(db)
@@ -0,0 +1,118 @@
+"""
+OCR Worker Pool for Educational Roguelike Game
+Runs Tesseract over many page images in a pool of warm worker processes
+"""
+
+import atexit
+import io
+import logging
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Optional, Union
+
+import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# ═══════════════════════════════════════════════════════════════════
+# 👷 WORKER SIDE (runs inside each pool process)
+# ═══════════════════════════════════════════════════════════════════
+
+# Per-process state: pytesseract and PIL are imported once per worker, not per page
+_TESS_INIT = False
+_pytesseract = None
+_Image = None
+
+
+def _init_worker():
+    """Import pytesseract/PIL and apply the configured tesseract path (once per process)"""
+    global _TESS_INIT, _pytesseract, _Image
+    if _TESS_INIT:
+        return
+
+    import pytesseract
+    from PIL import Image
+
+    if config.TESSERACT_CMD:
+        pytesseract.pytesseract.tesseract_cmd = config.TESSERACT_CMD
+
+    _pytesseract = pytesseract
+    _Image = Image
+    _TESS_INIT = True
+
+
+def _ocr_one(img_bytes: bytes, lang: str = None) -> str:
+    """OCR one encoded image (PNG bytes pickle cheaply across processes, PIL images don't)"""
+    _init_worker()
+    image = _Image.open(io.BytesIO(img_bytes))
+    text = _pytesseract.image_to_string(
+        image,
+        lang=lang or config.TESSERACT_LANG,
+        config=config.TESSERACT_CONFIG
+    )
+    return text.strip()
+
+
+# ═══════════════════════════════════════════════════════════════════
+# 🏊 SHARED POOL
+# ═══════════════════════════════════════════════════════════════════
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """Process pool shared by every OCR batch, so workers stay warm between PDFs"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(
+                    max_workers=config.OCR_POOL_WORKERS,
+                    initializer=_init_worker
+                )
+                atexit.register(shutdown_pool)
+    return _pool
+
+
+def shutdown_pool():
+    """Stop the worker processes (a later batch starts a fresh pool)"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def to_png_bytes(image) -> bytes:
+    """Encode a PIL image as PNG for sending to a worker"""
+    buffer = io.BytesIO()
+    image.save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+def ocr_images(images: Iterable[Union[bytes, object]], lang: str = None,
+               max_workers: int = None, chunksize: int = 4) -> List[str]:
+    """
+    OCR a batch of page images, in order
+
+    Args:
+        images: PIL images or already-encoded image bytes
+        lang: Tesseract languages (defaults to config.TESSERACT_LANG)
+        max_workers: 1 runs in this process; anything else uses the shared pool
+        chunksize: Pages handed to a worker per round trip
+
+    Returns:
+        Extracted text per image
+    """
+    page_bytes = [img if isinstance(img, bytes) else to_png_bytes(img) for img in images]
+    langs = [lang] * len(page_bytes)
+
+    # One worker (or one page): not worth a process round trip
+    if max_workers == 1 or len(page_bytes) <= 1:
+        return list(map(_ocr_one, page_bytes, langs))
+
+    logger.info(f"OCR of {len(page_bytes)} pages in the worker pool")
+    return list(get_pool().map(_ocr_one, page_bytes, langs, chunksize=chunksize))
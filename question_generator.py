@@ -4,17 +4,491 @@ Generates high-quality educational questions from PDF content
 FREE TIER AVAILABLE - More accessible than Claude
 """
 
+import asyncio
+import copy
+import hashlib
 import json
 import logging
-from typing import List, Dict, Optional
-from openai import OpenAI
+import pickle
+import re
+import threading
+import time
+import weakref
+from functools import lru_cache
+from string import Template
+from types import MappingProxyType
+from typing import Annotated, List, Dict, Optional, Literal, Tuple
+import httpx
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, InternalServerError, RateLimitError
 
 import config
-from database import question_manager
+from database import pdf_manager, question_manager, response_cache
+from game_engine import calculate_minimum_questions_needed
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Import tiktoken if available (accurate token counts for cost estimates and pacing)
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+# Import pydantic if available (compiled question schema; falls back to manual checks)
+try:
+    from pydantic import (
+        BaseModel, ConfigDict, StringConstraints, TypeAdapter, ValidationError, field_validator, model_validator
+    )
+    PYDANTIC_AVAILABLE = True
+except ImportError:
+    PYDANTIC_AVAILABLE = False
+
+# Import orjson if available (faster parsing of model responses)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Import embedding/vector search libraries if available (semantic cache)
+try:
+    import faiss
+    import numpy as np
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_CACHE_AVAILABLE = True
+except ImportError:
+    SEMANTIC_CACHE_AVAILABLE = False
+
+
+if PYDANTIC_AVAILABLE:
+    NonEmptyStr = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+    StrippedStr = Annotated[str, StringConstraints(strip_whitespace=True)]
+
+    class Question(BaseModel):
+        """Schema for one generated question (validates and normalizes in one pass)"""
+
+        # Keep any extra keys the model returns, as the dict-based path does
+        model_config = ConfigDict(extra='allow')
+
+        question_text: NonEmptyStr
+        question_type: Literal['multiple_choice', 'true_false']
+        correct_answer: NonEmptyStr
+        options: Optional[List[StrippedStr]] = None
+        explanation: NonEmptyStr
+        topic: Optional[str] = 'General'
+        difficulty: str = 'medium'
+
+        @field_validator('difficulty', mode='before')
+        @classmethod
+        def _default_difficulty(cls, value):
+            return value if value in config.DIFFICULTY_LEVELS else 'medium'
+
+        @model_validator(mode='after')
+        def _check_answer(self):
+            if self.question_type == 'multiple_choice':
+                if not self.options or len(self.options) < 2:
+                    raise ValueError("multiple_choice needs at least 2 options")
+                if self.correct_answer not in self.options:
+                    raise ValueError("correct_answer must be one of the options")
+            else:
+                self.correct_answer = self.correct_answer.lower()
+                if self.correct_answer not in ('true', 'false'):
+                    raise ValueError("true_false answer must be 'true' or 'false'")
+                self.options = ['true', 'false']
+            return self
+
+    # Compiled once; validates a whole list of questions inside pydantic-core
+    _QUESTIONS_ADAPTER = TypeAdapter(List[Question])
+
+
+XAI_BASE_URL = "https://api.x.ai/v1"
+
+# Shared pool limits and timeouts for API connections
+HTTP_LIMITS = httpx.Limits(
+    max_connections=config.API_MAX_CONNECTIONS,
+    max_keepalive_connections=config.API_MAX_CONNECTIONS
+)
+HTTP_TIMEOUT = httpx.Timeout(connect=10, read=120, write=30, pool=5)
+
+
+@lru_cache(maxsize=None)
+def get_client(api_key: str) -> OpenAI:
+    """
+    Get the shared Grok client for an API key
+
+    One client (and connection pool) per process, so generators don't redo
+    DNS/TLS handshakes for every request.
+    """
+    return OpenAI(
+        api_key=api_key,
+        base_url=XAI_BASE_URL,
+        http_client=httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+        max_retries=config.API_MAX_RETRIES
+    )
+
+
+# Static prompt text, built once; only the per-chunk values are substituted
+_DIFFICULTY_GUIDANCE = MappingProxyType({
+    'easy': 'Focus on basic recall and simple comprehension. Questions should test fundamental understanding.',
+    'medium': 'Mix of recall and application. Questions should require understanding and some analysis.',
+    'hard': 'Focus on analysis, synthesis, and critical thinking. Questions should be challenging.',
+    'mixed': 'Create a balanced mix: 40% easy, 40% medium, 20% hard questions.'
+})
+
+# Difficulty of chunk i (1-based) is _DIFFICULTY_ROTATION[(i - 1) % 5]
+_DIFFICULTY_ROTATION = ('easy', 'medium', 'medium', 'hard', 'mixed')
+
+# Instructions shared by every request go in the system message so they form an
+# identical prefix across chunks (cached by the API); chunk text goes last
+_SYSTEM_PROMPT = """You are an expert educational content creator specializing in creating high-quality study questions. Always respond with valid JSON only.
+
+REQUIREMENTS:
+1. Generate EXACTLY the number of questions requested
+2. Create a mix of question types:
+   - Multiple choice questions (4 options, only one correct)
+   - True/False questions
+3. For multiple choice questions:
+   - The correct answer should not be obvious
+   - Distractors (wrong answers) should be plausible and test common misconceptions
+   - Avoid "all of the above" or "none of the above" options
+4. Include a clear explanation for why the answer is correct
+5. Classify each question's difficulty as 'easy', 'medium', or 'hard'
+6. Extract or infer a topic/subject for each question
+7. Questions should test understanding, not just memorization
+8. Avoid trivial questions or those with obvious answers
+
+OUTPUT FORMAT:
+Return ONLY a valid JSON array. Each question should have this exact structure:
+
+[
+  {
+    "question_text": "The question text here?",
+    "question_type": "multiple_choice",
+    "correct_answer": "The correct answer",
+    "options": ["Option A", "Option B", "Option C", "Option D"],
+    "explanation": "Why this answer is correct and why others are wrong",
+    "topic": "Topic or subject area",
+    "difficulty": "easy|medium|hard"
+  },
+  {
+    "question_text": "Another question here?",
+    "question_type": "true_false",
+    "correct_answer": "true",
+    "options": ["true", "false"],
+    "explanation": "Explanation of the answer",
+    "topic": "Topic area",
+    "difficulty": "medium"
+  }
+]
+
+IMPORTANT:
+- Return ONLY the JSON array, no other text
+- Ensure valid JSON formatting
+- For true/false questions, correct_answer should be exactly "true" or "false" (lowercase)
+- For multiple choice, correct_answer should exactly match one of the options"""
+
+_PROMPT_TEMPLATE = Template("""Generate $num_questions educational questions based on the following text.
+
+DIFFICULTY LEVEL: $difficulty
+$guidance$topic_context
+
+SOURCE TEXT:
+$text""")
+
+MAX_PROMPT_TEXT_CHARS = 8000
+
+
+def _json_loads(text: str):
+    """Parse JSON text (orjson.JSONDecodeError subclasses json.JSONDecodeError)"""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(text)
+    return json.loads(text)
+
+
+# Markdown code fences around the output (```json ... ```)
+_FENCE_RE = re.compile(r'^\s*```(?:json)?[^\S\n]*\n?|\n?\s*```\s*$', re.IGNORECASE)
+# Tokens that matter for bracket matching: whole JSON strings (skipped) and brackets
+_BRACKET_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]]', re.DOTALL)
+
+
+def _find_json_array(text: str) -> Optional[list]:
+    """
+    Find the first balanced JSON array of objects in text
+
+    Each '[' is matched to its closing ']' by bracket depth, skipping string
+    contents, so brackets in surrounding prose or inside values don't end the
+    match early. Returns None if no complete array parses.
+    """
+    text = _FENCE_RE.sub('', text)
+    start = text.find('[')
+
+    while start != -1:
+        depth = 0
+        for match in _BRACKET_TOKEN_RE.finditer(text, start):
+            token = match.group()
+            if token == '[':
+                depth += 1
+            elif token == ']':
+                depth -= 1
+                if not depth:
+                    try:
+                        value = _json_loads(text[start:match.end()])
+                    except json.JSONDecodeError:
+                        break
+                    if isinstance(value, list) and all(isinstance(q, dict) for q in value):
+                        return value
+                    break
+
+        start = text.find('[', start + 1)
+
+    return None
+
+
+def _strip_options(options: list) -> list:
+    """Options with surrounding whitespace removed (non-strings left as they are)"""
+    return [o.strip() if isinstance(o, str) else o for o in options]
+
+
+def get_chunk_text(chunk: Dict, text: str = None, limit: int = None) -> str:
+    """
+    Get the text of a chunk, optionally truncated to limit chars
+
+    Chunks from PDFProcessor are {'chunk_id', 'start', 'end'} spans into the
+    document text, so only the part that is used gets sliced out. Chunks that
+    carry their own 'text' (other processors, older caches) are also accepted.
+    """
+    if 'text' in chunk:
+        return chunk['text'][:limit] if limit else chunk['text']
+    end = chunk['end'] if not limit else min(chunk['end'], chunk['start'] + limit)
+    return text[chunk['start']:end]
+
+
+# Encoding for models tiktoken doesn't know (Grok's tokenizer is close enough to it)
+DEFAULT_ENCODING = 'cl100k_base'
+ENCODING_RETRY_SECONDS = 60  # Wait before retrying an encoding that failed to load
+
+_encodings = {}  # Model -> loaded encoding (only successes are kept)
+_encoding_failures = {}  # Model -> time.monotonic() of the last failed load
+
+
+def _get_encoding(model: str):
+    """tiktoken encoding of a model (None if it can't be loaded, e.g. offline on first use)"""
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+
+    failed_at = _encoding_failures.get(model)
+    if failed_at is not None and time.monotonic() - failed_at < ENCODING_RETRY_SECONDS:
+        return None
+
+    try:
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding(DEFAULT_ENCODING)
+    except Exception as e:
+        _encoding_failures[model] = time.monotonic()
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens from length: {e}")
+        return None
+
+    _encodings[model] = encoding
+    _encoding_failures.pop(model, None)
+    return encoding
+
+
+def count_tokens(text: str, model: str = None) -> int:
+    """Count tokens in text (~4 chars per token if tiktoken isn't installed)"""
+    encoding = _get_encoding(model or config.GROK_MODEL) if TIKTOKEN_AVAILABLE else None
+    if encoding is None:
+        return len(text) // 4
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+_overhead_tokens = {}  # Model -> prompt overhead, once counted with a real encoding
+
+
+def _prompt_overhead_tokens(model: str) -> int:
+    """Tokens every request adds on top of the source text (system message + prompt template)"""
+    tokens = _overhead_tokens.get(model)
+    if tokens is None:
+        tokens = count_tokens(_SYSTEM_PROMPT, model) + count_tokens(_PROMPT_TEMPLATE.template, model)
+        if _get_encoding(model) is not None:
+            _overhead_tokens[model] = tokens
+    return tokens
+
+
+class RateLimitedExecutor:
+    """
+    Paces async API calls to stay under requests- and tokens-per-minute limits
+
+    Two token buckets refill continuously at rpm/60 and tpm/60 per second; each
+    call reserves its share up front and sleeps until the buckets cover it. The
+    buckets are shared by every thread and event loop of the process (one
+    instance lives on the shared QuestionGenerator), so concurrent uploads pace
+    against the same account limits. The concurrency cap applies per event loop.
+
+    Retries are handled here rather than in the SDK (clients use
+    config.API_MAX_RETRIES_ASYNC): 429s wait for the server's retry-after,
+    timeouts and 5xx errors back off exponentially.
+    """
+
+    def __init__(self, rpm: int = None, tpm: int = None, max_concurrent: int = None):
+        self.rpm = rpm or config.API_REQUESTS_PER_MINUTE
+        self.tpm = tpm or config.API_TOKENS_PER_MINUTE
+        self.max_concurrent = max_concurrent or config.MAX_CONCURRENT_REQUESTS
+        self.request_capacity = float(self.rpm)
+        self.token_capacity = float(self.tpm)
+        self.last_update = time.monotonic()
+        self.lock = threading.Lock()
+        self._semaphores = weakref.WeakKeyDictionary()  # Event loop -> asyncio.Semaphore
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self.last_update
+        self.request_capacity = min(self.rpm, self.request_capacity + self.rpm * elapsed / 60)
+        self.token_capacity = min(self.tpm, self.token_capacity + self.tpm * elapsed / 60)
+        self.last_update = now
+
+    def _reserve(self, tokens: int) -> float:
+        """Take one request and tokens from the buckets; return seconds until they're covered"""
+        with self.lock:
+            self._refill()
+            self.request_capacity -= 1
+            self.token_capacity -= tokens
+            return max(
+                -self.request_capacity * 60 / self.rpm,
+                -self.token_capacity * 60 / self.tpm,
+                0
+            )
+
+    async def acquire(self, tokens: int):
+        """Wait until one request and the given number of tokens are available"""
+        wait = self._reserve(min(tokens, self.tpm))
+        if wait:
+            await asyncio.sleep(wait)
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """In-flight cap of the running event loop (asyncio primitives can't cross loops)"""
+        loop = asyncio.get_running_loop()
+        with self.lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrent)
+            return semaphore
+
+    async def run(self, make_call, tokens: int):
+        """Run make_call() (a coroutine factory) once capacity allows, retrying on 429/5xx/timeouts"""
+        for attempt in range(1, config.RATE_LIMIT_MAX_ATTEMPTS + 1):
+            await self.acquire(tokens)
+
+            async with self._semaphore():
+                try:
+                    return await make_call()
+                except (RateLimitError, APIConnectionError, InternalServerError) as e:
+                    if attempt == config.RATE_LIMIT_MAX_ATTEMPTS:
+                        raise
+                    retry_after = self._retry_after(e, attempt)
+                    reason = type(e).__name__
+
+            logger.warning(f"{reason}, retrying in {retry_after:.1f}s (attempt {attempt})")
+            await asyncio.sleep(retry_after)
+
+    @staticmethod
+    def _retry_after(error: Exception, attempt: int) -> float:
+        """Seconds to wait: the retry-after header of a 429 (default 1s), else 2^(attempt-1) up to 8s"""
+        if not isinstance(error, RateLimitError):
+            return float(min(2 ** (attempt - 1), 8))
+        try:
+            return max(float(error.response.headers.get('retry-after', 1)), 0)
+        except (AttributeError, TypeError, ValueError):
+            return 1.0
+
+
+class StreamingQuestionParser:
+    """
+    Incrementally extracts question objects from a streamed JSON array
+
+    A single-pass state machine tracks bracket depth and string/escape state,
+    so each object is parsed as soon as its closing brace arrives. Text before
+    the array and an unfinished object at the end (token limit) are ignored.
+    Like _find_json_array, brackets that don't open an array of objects (such
+    as "[2]" in prose before it) are skipped.
+    """
+
+    def __init__(self):
+        self.parts = []  # Raw response text, kept for caching
+        self.in_array = False
+        self.done = False
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.current = []  # Characters of the object being read
+        self.count = 0  # Objects completed in the current array
+
+    def feed(self, text: str) -> List[Dict]:
+        """Consume a piece of the response; return the objects completed by it"""
+        self.parts.append(text)
+        completed = []
+
+        for ch in text:
+            if self.done:
+                break
+
+            if not self.in_array:
+                self.in_array = ch == '['
+                continue
+
+            # Before its first object, anything but '{' or ']' means this isn't the array
+            if not self.depth and not self.count and not ch.isspace() and ch not in '{]':
+                self.in_array = ch == '['
+                continue
+
+            if self.depth:
+                self.current.append(ch)
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif ch == '\\':
+                    self.escape = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch in '{[':
+                if not self.depth:
+                    if ch == '[':
+                        continue
+                    self.current = [ch]
+                self.depth += 1
+            elif ch in '}]':
+                if not self.depth:
+                    self.done = ch == ']'
+                    continue
+                self.depth -= 1
+                if not self.depth:
+                    obj_text = ''.join(self.current)
+                    self.current = []
+                    self.count += 1
+                    try:
+                        obj = _json_loads(obj_text)
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping malformed question JSON: {str(e)}")
+                        continue
+                    if isinstance(obj, dict):
+                        completed.append(obj)
+
+        return completed
+
+    def finish(self) -> str:
+        """End of stream: return the full raw response text"""
+        if not self.in_array:
+            raise ValueError("No JSON array found in response")
+        if self.depth:
+            logger.warning("Response was cut off mid-question, dropping the incomplete question")
+        return ''.join(self.parts)
+
 
 class QuestionGenerator:
     """Generates questions using Grok API (xAI)"""
@@ -25,11 +499,41 @@ class QuestionGenerator:
             raise ValueError("XAI_API_KEY not found in environment variables")
 
         # Grok API uses OpenAI-compatible format
-        self.client = OpenAI(
+        self.client = get_client(self.api_key)
+        # Async clients for concurrent batch generation, one per thread (see async_client)
+        self._local = threading.local()
+        # Paces every async request of the process (the generator is shared, see get_generator)
+        self.rate_limiter = RateLimitedExecutor()
+        self.model = config.GROK_MODEL
+
+    @property
+    def async_client(self) -> AsyncOpenAI:
+        """Async client of the current thread, created on first use"""
+        client = getattr(self._local, 'async_client', None)
+        if client is None:
+            client = self._local.async_client = self._new_async_client()
+        return client
+
+    def _new_async_client(self) -> AsyncOpenAI:
+        """Create the async Grok client (its pool is bound to one event loop, so not shared)"""
+        return AsyncOpenAI(
             api_key=self.api_key,
-            base_url="https://api.x.ai/v1"
+            base_url=XAI_BASE_URL,
+            http_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT),
+            max_retries=config.API_MAX_RETRIES_ASYNC
         )
-        self.model = config.GROK_MODEL
+
+    async def reset_async_client(self):
+        """
+        Close this thread's async client; the next use creates a fresh one
+
+        Its connection pool is tied to the event loop that used it, so this must
+        run before that loop is closed (e.g. at the end of asyncio.run).
+        """
+        client = getattr(self._local, 'async_client', None)
+        if client is not None:
+            self._local.async_client = None
+            await client.close()
 
     def generate_questions_from_text(
         self,
@@ -50,30 +554,74 @@ class QuestionGenerator:
         Returns:
             List of question dictionaries
         """
-        prompt = self._build_prompt(text, num_questions, difficulty, topic)
+        request = self._build_request(text, num_questions, difficulty, topic)
 
         try:
             logger.info(f"Generating {num_questions} questions (difficulty: {difficulty})")
 
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert educational content creator specializing in creating high-quality study questions. Always respond with valid JSON only."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=config.TEMPERATURE,
-                max_tokens=config.MAX_TOKENS
-            )
+            cache_key = self._cache_key(request)
+            response_text = self._get_cached_response(cache_key)
+
+            if response_text is None:
+                # Stream the response and validate each question as soon as it's complete
+                parser = StreamingQuestionParser()
+                questions = []
+                for chunk in self.client.chat.completions.create(**request, stream=True):
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        questions += self._validate_questions(parser.feed(chunk.choices[0].delta.content))
+
+                response_text = parser.finish()
+                if not questions:
+                    # Parse the text as a cached replay would, so both agree
+                    questions = self._parse_response(response_text)
+                # A response without one valid question is not worth replaying
+                if questions:
+                    self._cache_response(cache_key, response_text)
+            else:
+                questions = self._parse_response(response_text)
+
+            logger.info(f"Successfully generated {len(questions)} questions")
 
-            # Extract JSON from response
-            response_text = response.choices[0].message.content
-            questions = self._parse_response(response_text)
+            return questions
+
+        except Exception as e:
+            logger.error(f"Error generating questions: {str(e)}")
+            raise
+
+    async def agenerate_questions_from_text(
+        self,
+        text: str,
+        num_questions: int = 10,
+        difficulty: str = 'mixed',
+        topic: str = None
+    ) -> List[Dict]:
+        """Async version of generate_questions_from_text (same arguments and result)"""
+        request = self._build_request(text, num_questions, difficulty, topic)
+
+        try:
+            logger.info(f"Generating {num_questions} questions (difficulty: {difficulty})")
+
+            cache_key = self._cache_key(request)
+            response_text = self._get_cached_response(cache_key)
+
+            if response_text is None:
+                # Stream the response and validate each question as soon as it's complete
+                parser = StreamingQuestionParser()
+                questions = []
+                stream = await self.async_client.chat.completions.create(**request, stream=True)
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        questions += self._validate_questions(parser.feed(chunk.choices[0].delta.content))
+
+                response_text = parser.finish()
+                if not questions:
+                    # Parse the text as a cached replay would, so both agree
+                    questions = self._parse_response(response_text)
+                # A response without one valid question is not worth replaying
+                if questions:
+                    self._cache_response(cache_key, response_text)
+            else:
+                questions = self._parse_response(response_text)
 
             logger.info(f"Successfully generated {len(questions)} questions")
 
@@ -83,114 +631,121 @@ class QuestionGenerator:
             logger.error(f"Error generating questions: {str(e)}")
             raise
 
-    def _build_prompt(
+    def _build_request(
         self,
         text: str,
         num_questions: int,
         difficulty: str,
         topic: str = None
-    ) -> str:
-        """Build optimized prompt for Grok API"""
+    ) -> Dict:
+        """Build chat completion arguments shared by the sync and async clients"""
+        prompt = self._build_prompt(text, num_questions, difficulty, topic)
 
-        difficulty_guidance = {
-            'easy': 'Focus on basic recall and simple comprehension. Questions should test fundamental understanding.',
-            'medium': 'Mix of recall and application. Questions should require understanding and some analysis.',
-            'hard': 'Focus on analysis, synthesis, and critical thinking. Questions should be challenging.',
-            'mixed': 'Create a balanced mix: 40% easy, 40% medium, 20% hard questions.'
+        return {
+            'model': self.model,
+            'messages': [
+                {
+                    "role": "system",
+                    "content": _SYSTEM_PROMPT
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            'temperature': config.TEMPERATURE,
+            'max_tokens': config.MAX_TOKENS
         }
 
-        topic_context = f"\n\nFocus specifically on the topic: {topic}" if topic else ""
+    @staticmethod
+    def _cache_key(request: Dict) -> str:
+        """Canonical hash of a request (model, messages, temperature, max_tokens)"""
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
 
-        prompt = f"""Generate {num_questions} educational questions based on the following text.
+    def _get_cached_response(self, cache_key: str) -> Optional[str]:
+        """Get a cached raw response for an identical earlier request"""
+        if not config.RESPONSE_CACHE_ENABLED:
+            return None
 
-DIFFICULTY LEVEL: {difficulty}
-{difficulty_guidance.get(difficulty, difficulty_guidance['mixed'])}{topic_context}
+        response_text = response_cache.get(cache_key)
+        if response_text is not None:
+            logger.info("Using cached API response")
+        return response_text
 
-SOURCE TEXT:
-{text[:8000]}
+    def _cache_response(self, cache_key: str, response_text: str):
+        """Cache a raw response (parsed on every use, so validation stays in one place)"""
+        if config.RESPONSE_CACHE_ENABLED and response_text:
+            response_cache.set(cache_key, response_text)
 
-REQUIREMENTS:
-1. Generate EXACTLY {num_questions} questions
-2. Create a mix of question types:
-   - Multiple choice questions (4 options, only one correct)
-   - True/False questions
-3. For multiple choice questions:
-   - The correct answer should not be obvious
-   - Distractors (wrong answers) should be plausible and test common misconceptions
-   - Avoid "all of the above" or "none of the above" options
-4. Include a clear explanation for why the answer is correct
-5. Classify each question's difficulty as 'easy', 'medium', or 'hard'
-6. Extract or infer a topic/subject for each question
-7. Questions should test understanding, not just memorization
-8. Avoid trivial questions or those with obvious answers
-
-OUTPUT FORMAT:
-Return ONLY a valid JSON array. Each question should have this exact structure:
-
-[
-  {{
-    "question_text": "The question text here?",
-    "question_type": "multiple_choice",
-    "correct_answer": "The correct answer",
-    "options": ["Option A", "Option B", "Option C", "Option D"],
-    "explanation": "Why this answer is correct and why others are wrong",
-    "topic": "Topic or subject area",
-    "difficulty": "easy|medium|hard"
-  }},
-  {{
-    "question_text": "Another question here?",
-    "question_type": "true_false",
-    "correct_answer": "true",
-    "options": ["true", "false"],
-    "explanation": "Explanation of the answer",
-    "topic": "Topic area",
-    "difficulty": "medium"
-  }}
-]
-
-IMPORTANT:
-- Return ONLY the JSON array, no other text
-- Ensure valid JSON formatting
-- For true/false questions, correct_answer should be exactly "true" or "false" (lowercase)
-- For multiple choice, correct_answer should exactly match one of the options
+    def _build_prompt(
+        self,
+        text: str,
+        num_questions: int,
+        difficulty: str,
+        topic: str = None
+    ) -> str:
+        """Build optimized prompt for Grok API"""
+        topic_context = f"\n\nFocus specifically on the topic: {topic}" if topic else ""
 
-Generate the questions now:"""
+        # Only slice (copy) the text when it's actually over the limit
+        if len(text) > MAX_PROMPT_TEXT_CHARS:
+            text = text[:MAX_PROMPT_TEXT_CHARS]
 
-        return prompt
+        return _PROMPT_TEMPLATE.substitute(
+            num_questions=num_questions,
+            difficulty=difficulty,
+            guidance=_DIFFICULTY_GUIDANCE.get(difficulty, _DIFFICULTY_GUIDANCE['mixed']),
+            topic_context=topic_context,
+            text=text
+        )
 
     def _parse_response(self, response_text: str) -> List[Dict]:
         """Parse Grok's response and extract questions"""
 
-        try:
-            # Try to find JSON in the response
-            # Sometimes LLMs add explanation text, so we need to extract JSON
-
-            # Look for JSON array pattern
-            start_idx = response_text.find('[')
-            end_idx = response_text.rfind(']')
+        # LLMs sometimes wrap the JSON in markdown fences or add explanation text
+        questions = _find_json_array(response_text)
 
-            if start_idx == -1 or end_idx == -1:
-                raise ValueError("No JSON array found in response")
+        if questions is None:
+            # No complete array (e.g. cut off at the token limit): keep the
+            # complete questions, as the streaming path does
+            parser = StreamingQuestionParser()
+            questions = parser.feed(response_text)
+            try:
+                parser.finish()
+            except ValueError:
+                logger.error(f"Response text: {response_text[:500]}")
+                raise
 
-            json_str = response_text[start_idx:end_idx + 1]
+        # Validate and clean questions
+        return self._validate_questions(questions)
 
-            # Parse JSON
-            questions = json.loads(json_str)
+    def _validate_questions(self, questions: List[Dict]) -> List[Dict]:
+        """Validate and clean parsed questions, skipping invalid ones"""
+        validated_questions = []
 
-            # Validate and clean questions
-            validated_questions = []
-            for q in questions:
-                if self._validate_question(q):
-                    validated_questions.append(self._clean_question(q))
-                else:
-                    logger.warning(f"Skipping invalid question: {q.get('question_text', 'unknown')}")
+        if PYDANTIC_AVAILABLE:
+            try:
+                models = _QUESTIONS_ADAPTER.validate_python(questions)
+            except ValidationError as e:
+                # Skip the items that failed and validate the rest in one go
+                invalid = {err['loc'][0] for err in e.errors() if err['loc']}
+                for i in sorted(invalid):
+                    q = questions[i]
+                    text = q.get('question_text', 'unknown') if isinstance(q, dict) else q
+                    logger.warning(f"Skipping invalid question: {text}")
+                models = _QUESTIONS_ADAPTER.validate_python(
+                    [q for i, q in enumerate(questions) if i not in invalid]
+                )
+            return [m.model_dump() for m in models]
 
-            return validated_questions
+        for q in questions:
+            if self._validate_question(q):
+                validated_questions.append(self._clean_question(q))
+            else:
+                logger.warning(f"Skipping invalid question: {q.get('question_text', 'unknown')}")
 
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON parse error: {str(e)}")
-            logger.error(f"Response text: {response_text[:500]}")
-            raise ValueError(f"Failed to parse questions from response: {str(e)}")
+        return validated_questions
 
     def _validate_question(self, question: Dict) -> bool:
         """Validate that a question has all required fields"""
@@ -202,9 +757,9 @@ Generate the questions now:"""
             'explanation'
         ]
 
-        # Check required fields
+        # Check required fields (whitespace-only counts as missing, as in the Question model)
         for field in required_fields:
-            if field not in question or not question[field]:
+            if field not in question or not str(question[field]).strip():
                 return False
 
         # Validate question type
@@ -215,12 +770,13 @@ Generate the questions now:"""
         if question['question_type'] == 'multiple_choice':
             if 'options' not in question or len(question['options']) < 2:
                 return False
-            if question['correct_answer'] not in question['options']:
+            # Compare as cleaned: both sides stripped
+            if question['correct_answer'].strip() not in _strip_options(question['options']):
                 return False
 
         # Validate true/false
         if question['question_type'] == 'true_false':
-            if question['correct_answer'].lower() not in ['true', 'false']:
+            if question['correct_answer'].strip().lower() not in ['true', 'false']:
                 return False
 
         return True
@@ -245,18 +801,26 @@ Generate the questions now:"""
         question['question_text'] = question['question_text'].strip()
         question['correct_answer'] = question['correct_answer'].strip()
         question['explanation'] = question['explanation'].strip()
+        if question.get('options'):
+            question['options'] = _strip_options(question['options'])
 
         return question
 
-    def estimate_cost(self, text_length: int, num_questions: int) -> Dict:
+    def estimate_cost(self, text_length: int, num_questions: int, text: str = None) -> Dict:
         """
         Estimate API cost for generating questions
 
+        Pass the text itself to count its tokens with tiktoken (when installed)
+        instead of estimating them from text_length.
+
         Returns:
             Dict with estimated costs
         """
-        # Rough estimates for Grok API
-        input_tokens = (text_length / 4) + 500  # Text + prompt
+        if text is not None and TIKTOKEN_AVAILABLE:
+            input_tokens = count_tokens(text, self.model) + _prompt_overhead_tokens(self.model)
+        else:
+            # Rough estimates for Grok API
+            input_tokens = (text_length / 4) + 500  # Text + prompt
         output_tokens = num_questions * config.AVG_OUTPUT_TOKENS_PER_QUESTION
 
         # Grok pricing (update based on current xAI pricing)
@@ -275,78 +839,353 @@ Generate the questions now:"""
         }
 
 
+class SemanticCache:
+    """
+    Reuses questions generated for near-duplicate chunks
+
+    Chunks are embedded with a small local model; a FAISS inner-product index
+    over normalized vectors gives cosine similarity. Persisted to SEMANTIC_CACHE_DIR.
+    """
+
+    def __init__(self, cache_dir=None, threshold: float = None):
+        self.cache_dir = cache_dir or config.SEMANTIC_CACHE_DIR
+        self.threshold = threshold or config.SEMANTIC_CACHE_THRESHOLD
+        self.model = SentenceTransformer(config.SEMANTIC_CACHE_MODEL)
+        self.index = faiss.IndexFlatIP(self.model.get_sentence_embedding_dimension())
+        self.questions: Dict[int, List[Dict]] = {}  # Index vector id -> questions
+        self._lock = threading.Lock()  # Shared by concurrent generation runs
+        self._load()
+
+    def embed(self, texts: List[str]):
+        """Embed texts as normalized float32 vectors"""
+        vectors = self.model.encode([text[:8000] for text in texts], normalize_embeddings=True)
+        return np.asarray(vectors, dtype='float32')
+
+    def lookup(self, vectors) -> List[Optional[List[Dict]]]:
+        """Get a copy of the cached questions for each vector (None if no near-duplicate)"""
+        with self._lock:
+            if self.index.ntotal == 0:
+                return [None] * len(vectors)
+
+            scores, ids = self.index.search(vectors, 1)
+            return [
+                copy.deepcopy(self.questions[int(ids[k][0])]) if scores[k][0] > self.threshold else None
+                for k in range(len(vectors))
+            ]
+
+    def add(self, vectors, questions_list: List[List[Dict]]):
+        """Cache generated questions under their chunk vectors and persist"""
+        with self._lock:
+            first_id = self.index.ntotal
+            self.index.add(vectors)
+            for k, questions in enumerate(questions_list):
+                self.questions[first_id + k] = questions
+            self._save()
+
+    def _load(self):
+        index_file = self.cache_dir / 'index.faiss'
+        questions_file = self.cache_dir / 'questions.pkl'
+
+        if index_file.exists() and questions_file.exists():
+            # Both files or neither: an index without its questions would fail on lookup
+            try:
+                index = faiss.read_index(str(index_file))
+                with open(questions_file, 'rb') as f:
+                    questions = pickle.load(f)
+                if index.d != self.index.d or sorted(questions) != list(range(index.ntotal)):
+                    raise ValueError("index and questions don't match")
+            except Exception as e:
+                logger.warning(f"Semantic cache load failed, starting empty: {e}")
+                return
+            self.index = index
+            self.questions = questions
+
+    def _save(self):
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            faiss.write_index(self.index, str(self.cache_dir / 'index.faiss'))
+            with open(self.cache_dir / 'questions.pkl', 'wb') as f:
+                pickle.dump(self.questions, f)
+        except Exception as e:
+            logger.warning(f"Semantic cache save failed: {e}")
+
+
 class QuestionBatchGenerator:
     """Handles batch generation of questions from multiple text chunks"""
 
     def __init__(self, generator: QuestionGenerator = None):
         self.generator = generator or QuestionGenerator()
 
+        self.semantic_cache = None
+        if config.SEMANTIC_CACHE_ENABLED and SEMANTIC_CACHE_AVAILABLE:
+            try:
+                self.semantic_cache = SemanticCache()
+            except Exception as e:
+                logger.warning(f"Semantic cache unavailable: {e}")
+
     def generate_from_chunks(
         self,
         chunks: List[Dict],
         questions_per_chunk: int = None,
         total_questions: int = None,
-        difficulty_distribution: Dict = None
+        difficulty_distribution: Dict = None,
+        text: str = None,
+        difficulty_rotation: Tuple[str, ...] = None
     ) -> List[Dict]:
         """
         Generate questions from multiple text chunks
 
+        Chunk requests are sent concurrently (see agenerate_from_chunks).
+
         Args:
             chunks: List of text chunks from PDF
             questions_per_chunk: Questions per chunk (if None, uses total_questions)
             total_questions: Total questions to generate across all chunks
             difficulty_distribution: Dict like {'easy': 0.4, 'medium': 0.4, 'hard': 0.2}
+            text: Full document text the chunk spans point into
+            difficulty_rotation: Difficulties cycled through chunk by chunk
+                (default: _DIFFICULTY_ROTATION)
 
         Returns:
             List of all generated questions
         """
-        if not chunks:
-            raise ValueError("No chunks provided")
+        async def run() -> List[Dict]:
+            try:
+                return await self.agenerate_from_chunks(
+                    chunks,
+                    questions_per_chunk=questions_per_chunk,
+                    total_questions=total_questions,
+                    difficulty_distribution=difficulty_distribution,
+                    text=text,
+                    difficulty_rotation=difficulty_rotation
+                )
+            finally:
+                await self.generator.reset_async_client()
 
-        # Calculate questions per chunk
-        if total_questions:
-            questions_per_chunk = max(1, total_questions // len(chunks))
-        elif not questions_per_chunk:
-            questions_per_chunk = 5
+        return asyncio.run(run())
+
+    async def agenerate_from_chunks(
+        self,
+        chunks: List[Dict],
+        questions_per_chunk: int = None,
+        total_questions: int = None,
+        difficulty_distribution: Dict = None,
+        text: str = None,
+        difficulty_rotation: Tuple[str, ...] = None
+    ) -> List[Dict]:
+        """
+        Generate questions from multiple text chunks concurrently
+
+        Requests are paced by a RateLimitedExecutor (RPM/TPM limits, at most
+        config.MAX_CONCURRENT_REQUESTS in flight). Results are collected in chunk order, so the output matches a sequential run.
+
+        With total_questions set, only as many chunks as that total needs are
+        requested at a time; more follow only if chunks fail or come up short.
+        """
+        questions_per_chunk = self._questions_per_chunk(chunks, questions_per_chunk, total_questions)
 
         all_questions = []
         difficulty_dist = difficulty_distribution or {'easy': 0.4, 'medium': 0.4, 'hard': 0.2}
 
         logger.info(f"Generating questions from {len(chunks)} chunks")
 
-        for i, chunk in enumerate(chunks, 1):
-            # Determine difficulty for this chunk
-            # Rotate through difficulties based on distribution
-            if i % 5 == 1:
-                difficulty = 'easy'
-            elif i % 5 == 2 or i % 5 == 3:
-                difficulty = 'medium'
-            elif i % 5 == 4:
-                difficulty = 'hard'
-            else:
-                difficulty = 'mixed'
+        # Reuse questions of near-duplicate chunks seen before
+        vectors = cached = None
+        if self.semantic_cache:
+            vectors = self.semantic_cache.embed([get_chunk_text(chunk, text) for chunk in chunks])
+            cached = self.semantic_cache.lookup(vectors)
+            logger.info(f"Semantic cache: {sum(c is not None for c in cached)}/{len(chunks)} chunks reused")
 
-            try:
-                questions = self.generator.generate_questions_from_text(
-                    text=chunk['text'],
+        executor = self.generator.rate_limiter
+
+        async def generate_chunk(i: int, chunk: Dict) -> List[Dict]:
+            if cached and cached[i - 1] is not None:
+                return cached[i - 1][:questions_per_chunk]
+
+            # Difficulty comes from the chunk's position, not completion order
+            difficulty = self._chunk_difficulty(i, difficulty_rotation)
+            prompt_text = get_chunk_text(chunk, text, MAX_PROMPT_TEXT_CHARS)
+            estimate = self.generator.estimate_cost(len(prompt_text), questions_per_chunk, text=prompt_text)
+
+            return await executor.run(
+                lambda: self.generator.agenerate_questions_from_text(
+                    text=prompt_text,
                     num_questions=questions_per_chunk,
                     difficulty=difficulty
-                )
+                ),
+                tokens=estimate['estimated_total_tokens']
+            )
+
+        next_chunk = 0
+        while next_chunk < len(chunks):
+            # Request just enough chunks for the questions still missing
+            if total_questions:
+                missing = total_questions - len(all_questions)
+                needed = -(-missing // questions_per_chunk)  # Rounded up
+                wave = range(next_chunk, min(next_chunk + needed, len(chunks)))
+            else:
+                wave = range(next_chunk, len(chunks))
+            next_chunk = wave.stop
+
+            results = await asyncio.gather(
+                *(generate_chunk(k + 1, chunks[k]) for k in wave),
+                return_exceptions=True
+            )
+
+            if self.semantic_cache:
+                new = [
+                    k for k, questions in zip(wave, results)
+                    if cached[k] is None and questions and not isinstance(questions, Exception)
+                ]
+                if new:
+                    self.semantic_cache.add(
+                        vectors[new], [copy.deepcopy(results[k - wave.start]) for k in new]
+                    )
+
+            for i, questions in enumerate(results, wave.start + 1):
+                if isinstance(questions, Exception):
+                    logger.error(f"Error generating questions for chunk {i}: {str(questions)}")
+                    continue
 
                 all_questions.extend(questions)
                 logger.info(f"Chunk {i}/{len(chunks)}: Generated {len(questions)} questions")
 
-            except Exception as e:
-                logger.error(f"Error generating questions for chunk {i}: {str(e)}")
-                continue
+                # Stop if we've reached the desired total
+                if total_questions and len(all_questions) >= total_questions:
+                    break
 
-            # Stop if we've reached the desired total
             if total_questions and len(all_questions) >= total_questions:
                 break
 
         logger.info(f"Total questions generated: {len(all_questions)}")
         return all_questions
 
+    def submit_batch(
+        self,
+        chunks: List[Dict],
+        questions_per_chunk: int = None,
+        total_questions: int = None,
+        text: str = None,
+        difficulty_rotation: Tuple[str, ...] = None
+    ) -> str:
+        """
+        Submit one request per chunk to the Batch API
+
+        Batches are processed offline (within config.BATCH_COMPLETION_WINDOW)
+        with their own rate limits and discounted pricing.
+
+        Returns:
+            Batch ID, to be passed to wait_for_batch
+        """
+        questions_per_chunk = self._questions_per_chunk(chunks, questions_per_chunk, total_questions)
+
+        lines = []
+        for i, chunk in enumerate(chunks, 1):
+            lines.append(json.dumps({
+                'custom_id': f"chunk-{i}",
+                'method': 'POST',
+                'url': '/v1/chat/completions',
+                'body': self.generator._build_request(
+                    get_chunk_text(chunk, text, MAX_PROMPT_TEXT_CHARS),
+                    questions_per_chunk, self._chunk_difficulty(i, difficulty_rotation)
+                )
+            }))
+
+        client = self.generator.client
+        batch_file = client.files.create(
+            file=('questions_batch.jsonl', '\n'.join(lines).encode('utf-8')),
+            purpose='batch'
+        )
+        batch = client.batches.create(
+            input_file_id=batch_file.id,
+            endpoint='/v1/chat/completions',
+            completion_window=config.BATCH_COMPLETION_WINDOW
+        )
+
+        logger.info(f"Submitted batch {batch.id} with {len(chunks)} chunks")
+        return batch.id
+
+    def wait_for_batch(self, batch_id: str, timeout: float = None,
+                       total_questions: int = None) -> List[Dict]:
+        """
+        Poll a batch until it finishes (exponential backoff) and parse its results
+
+        Expired or cancelled batches still return the requests that finished
+        before the cutoff; a batch without an output file raises RuntimeError.
+
+        Args:
+            batch_id: ID returned by submit_batch
+            timeout: Seconds to wait before raising TimeoutError
+                (default: config.BATCH_WAIT_TIMEOUT)
+            total_questions: Stop adding chunks once this many questions are collected
+
+        Returns:
+            List of all generated questions, in chunk order
+        """
+        client = self.generator.client
+        interval = config.BATCH_POLL_INTERVAL
+        timeout = timeout or config.BATCH_WAIT_TIMEOUT
+        deadline = time.monotonic() + timeout
+
+        while True:
+            batch = client.batches.retrieve(batch_id)
+
+            if batch.status in ('completed', 'failed', 'expired', 'cancelled'):
+                break
+            if time.monotonic() + interval > deadline:
+                raise TimeoutError(f"Batch {batch_id} still {batch.status} after {timeout}s")
+
+            logger.info(f"Batch {batch_id} is {batch.status}, checking again in {interval}s")
+            time.sleep(interval)
+            interval = min(interval * 2, config.BATCH_POLL_MAX_INTERVAL)
+
+        if not batch.output_file_id:
+            raise RuntimeError(f"Batch {batch_id} {batch.status} without any results")
+        if batch.status != 'completed':
+            logger.warning(f"Batch {batch_id} {batch.status}, using the requests that finished")
+
+        # Results come back in completion order; key them by chunk number
+        results = {}
+        for line in client.files.content(batch.output_file_id).text.splitlines():
+            if not line.strip():
+                continue
+            record = _json_loads(line)
+            i = int(record['custom_id'].split('-')[1])
+
+            try:
+                response_text = record['response']['body']['choices'][0]['message']['content']
+                results[i] = self.generator._parse_response(response_text)
+            except (KeyError, IndexError, TypeError, ValueError) as e:
+                logger.error(f"Error in batch result for chunk {i}: {str(e)}")
+
+        all_questions = []
+        for i in sorted(results):
+            all_questions.extend(results[i])
+
+            # Stop if we've reached the desired total (as agenerate_from_chunks does)
+            if total_questions and len(all_questions) >= total_questions:
+                break
+
+        logger.info(f"Batch {batch_id}: {len(all_questions)} questions from {len(results)} chunks")
+        return all_questions
+
+    @staticmethod
+    def _questions_per_chunk(chunks: List[Dict], questions_per_chunk: int = None,
+                             total_questions: int = None) -> int:
+        """Work out how many questions to request per chunk"""
+        if not chunks:
+            raise ValueError("No chunks provided")
+
+        if total_questions:
+            return max(1, total_questions // len(chunks))
+        return questions_per_chunk or 5
+
+    @staticmethod
+    def _chunk_difficulty(i: int, rotation: Tuple[str, ...] = None) -> str:
+        """Determine difficulty for chunk i (1-based), rotating through difficulties"""
+        rotation = rotation or _DIFFICULTY_ROTATION
+        return rotation[(i - 1) % len(rotation)]
+
     def save_questions_to_db(self, pdf_id: int, questions: List[Dict]) -> int:
         """
         Save generated questions to database
@@ -354,26 +1193,45 @@ class QuestionBatchGenerator:
         Returns:
             Number of questions saved
         """
-        questions_data = []
-
-        for q in questions:
-            questions_data.append({
-                'pdf_id': pdf_id,
-                'question_text': q['question_text'],
-                'question_type': q['question_type'],
-                'correct_answer': q['correct_answer'],
-                'options': q.get('options'),
-                'explanation': q['explanation'],
-                'topic': q.get('topic', 'General'),
-                'difficulty': q.get('difficulty', 'medium')
-            })
-
-        count = question_manager.add_questions_batch(questions_data)
+        # Validated questions already carry every column (topic/difficulty defaults included)
+        count = question_manager.add_questions_many(pdf_id, questions)
         logger.info(f"Saved {count} questions to database for PDF {pdf_id}")
 
         return count
 
 
+# Process-wide generators, created on first use (see get_generator)
+_generator: Optional[QuestionGenerator] = None
+_batch_generator: Optional[QuestionBatchGenerator] = None
+_generator_lock = threading.Lock()
+
+
+def get_generator() -> QuestionGenerator:
+    """
+    Get the shared QuestionGenerator
+
+    Reusing it keeps API connections warm across uploads. The lock is only
+    taken until the instance exists.
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                _generator = QuestionGenerator()
+    return _generator
+
+
+def get_batch_generator() -> QuestionBatchGenerator:
+    """Get the shared QuestionBatchGenerator (loads the semantic cache only once)"""
+    global _batch_generator
+    if _batch_generator is None:
+        generator = get_generator()
+        with _generator_lock:
+            if _batch_generator is None:
+                _batch_generator = QuestionBatchGenerator(generator)
+    return _batch_generator
+
+
 # ═══════════════════════════════════════════════════════════════════
 # 🚀 HIGH-LEVEL WORKFLOW FUNCTION
 # ═══════════════════════════════════════════════════════════════════
@@ -382,7 +1240,8 @@ def process_pdf_and_generate_questions(
     pdf_id: int,
     text: str,
     chunks: List[Dict],
-    num_questions: int = None
+    num_questions: int = None,
+    mode: str = 'realtime'
 ) -> Dict:
     """
     Complete workflow: generate and save questions from PDF
@@ -390,25 +1249,24 @@ def process_pdf_and_generate_questions(
     Args:
         pdf_id: Database ID of the PDF
         text: Full text from PDF
-        chunks: Text chunks from PDF
+        chunks: Text chunks from PDF (spans into text)
         num_questions: Target number of questions (default: based on game requirements)
+        mode: 'realtime' (concurrent requests) or 'batch' (Batch API, cheaper but
+            can take up to config.BATCH_COMPLETION_WINDOW)
 
     Returns:
         Dict with generation stats
     """
-    from database import pdf_manager as db_pdf_manager
-    from game_engine import calculate_minimum_questions_needed
-
-    # Get PDF info
-    pdf_info = db_pdf_manager.get_pdf(pdf_id)
-    if not pdf_info:
+    # Get PDF title (the only column needed)
+    pdf_title = pdf_manager.get_pdf_title(pdf_id)
+    if pdf_title is None:
         raise ValueError(f"PDF {pdf_id} not found in database")
 
+    # Minimum questions needed for a full game run
+    min_needed = calculate_minimum_questions_needed()
+
     # Determine number of questions
     if not num_questions:
-        # Calculate minimum questions needed for a full game run
-        min_needed = calculate_minimum_questions_needed()
-
         # Estimate based on text length
         words = len(text.split())
         text_based = max(config.MIN_QUESTIONS_TO_START, min(100, words // 250))
@@ -419,31 +1277,36 @@ def process_pdf_and_generate_questions(
         logger.info(f"Generating {num_questions} questions (minimum needed: {min_needed}, text-based: {text_based})")
 
     # Initialize generators
-    generator = QuestionGenerator()
-    batch_generator = QuestionBatchGenerator(generator)
+    generator = get_generator()
+    batch_generator = get_batch_generator()
 
     # Estimate cost
-    cost_estimate = generator.estimate_cost(len(text), num_questions)
+    cost_estimate = generator.estimate_cost(len(text), num_questions, text=text)
     logger.info(f"Estimated cost: ${cost_estimate['estimated_cost_usd']:.4f}")
 
     # Generate questions
-    questions = batch_generator.generate_from_chunks(
-        chunks=chunks,
-        total_questions=num_questions
-    )
+    if mode == 'batch':
+        batch_id = batch_generator.submit_batch(chunks, total_questions=num_questions, text=text)
+        questions = batch_generator.wait_for_batch(batch_id, total_questions=num_questions)
+    else:
+        questions = batch_generator.generate_from_chunks(
+            chunks=chunks,
+            total_questions=num_questions,
+            text=text
+        )
 
     # Save to database
     saved_count = batch_generator.save_questions_to_db(pdf_id, questions)
 
     # Mark PDF as processed
-    db_pdf_manager.mark_processed(pdf_id)
+    pdf_manager.mark_processed(pdf_id)
 
     return {
         'pdf_id': pdf_id,
-        'pdf_title': pdf_info['title'],
+        'pdf_title': pdf_title,
         'questions_generated': len(questions),
         'questions_saved': saved_count,
         'cost_estimate': cost_estimate,
-        'minimum_needed': calculate_minimum_questions_needed(),
+        'minimum_needed': min_needed,
         'success': True
     }
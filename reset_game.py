@@ -6,9 +6,48 @@ Limpia TODO: base de datos, PDFs, caché, sesiones
 
 import os
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 import sqlite3
 
+UNLINK_WORKERS = 8
+
+# Cachés en disco: (directorio, archivos que se cuentan, descripción)
+CACHE_DIRS = (
+    (Path('data/ocr_cache'), '.pkl', 'Caché de OCR'),
+    (Path('data/pdf_cache'), '.pkl', 'Caché de texto extraído'),
+    (Path('data/semcache'), '', 'Caché semántica'),
+    (Path('data/stats_cache'), '.pkl', 'Caché de estadísticas'),
+)
+
+
+def _fast_purge(dirpath: Path, suffix: str = '') -> int:
+    """Vacía un directorio de golpe (rmtree + mkdir) y devuelve cuántos archivos *suffix había"""
+    with os.scandir(dirpath) as entries:
+        count = sum(1 for e in entries if e.name.endswith(suffix))
+    shutil.rmtree(dirpath, ignore_errors=True)
+    dirpath.mkdir(parents=True, exist_ok=True)
+    return count
+
+
+def _unlink_many(paths) -> int:
+    """Elimina archivos en paralelo; solapa la latencia de cada unlink"""
+    paths = [str(p) for p in paths]
+    with ThreadPoolExecutor(max_workers=UNLINK_WORKERS) as executor:
+        list(executor.map(os.unlink, paths))
+    return len(paths)
+
+
+def _purge_caches():
+    """Vacía todas las cachés en disco (pueden contener texto de PDFs ya eliminados)"""
+    for cache_dir, suffix, label in CACHE_DIRS:
+        if cache_dir.exists():
+            count = _fast_purge(cache_dir, suffix)
+            print(f"   ✅ {label}: {count} archivos eliminados")
+        else:
+            print(f"   ℹ️  {label}: no existía")
+
+
 def reset_complete():
     """Reset completo del sistema"""
     
@@ -32,38 +71,29 @@ def reset_complete():
         print("   ✅ Base de datos eliminada")
     else:
         print("   ℹ️  Base de datos no existía")
+    # Archivos del modo WAL: no deben quedar junto a la base de datos nueva
+    for suffix in ('-wal', '-shm'):
+        Path(f'{db_path}{suffix}').unlink(missing_ok=True)
     
     # 2. Eliminar PDFs subidos
     print("\n📄 Eliminando PDFs...")
     pdf_dir = Path('data/pdfs')
     if pdf_dir.exists():
-        count = len(list(pdf_dir.glob('*.pdf')))
-        shutil.rmtree(pdf_dir)
-        pdf_dir.mkdir(parents=True, exist_ok=True)
+        count = _fast_purge(pdf_dir, '.pdf')
         print(f"   ✅ {count} PDFs eliminados")
     else:
         pdf_dir.mkdir(parents=True, exist_ok=True)
         print("   ℹ️  Directorio PDFs recreado")
     
-    # 3. Eliminar caché de OCR
-    print("\n🔍 Eliminando caché de OCR...")
-    ocr_cache_dir = Path('data/ocr_cache')
-    if ocr_cache_dir.exists():
-        count = len(list(ocr_cache_dir.glob('*.pkl')))
-        shutil.rmtree(ocr_cache_dir)
-        ocr_cache_dir.mkdir(parents=True, exist_ok=True)
-        print(f"   ✅ {count} archivos de caché eliminados")
-    else:
-        ocr_cache_dir.mkdir(parents=True, exist_ok=True)
-        print("   ℹ️  Directorio caché recreado")
+    # 3. Eliminar cachés (OCR, extracción, semántica, estadísticas)
+    print("\n🔍 Eliminando cachés...")
+    _purge_caches()
     
     # 4. Eliminar exports/estadísticas
     print("\n📊 Eliminando estadísticas exportadas...")
     export_dir = Path('data/exports')
     if export_dir.exists():
-        count = len(list(export_dir.glob('*')))
-        for file in export_dir.glob('*'):
-            file.unlink()
+        count = _fast_purge(export_dir)
         print(f"   ✅ {count} archivos de estadísticas eliminados")
     else:
         export_dir.mkdir(parents=True, exist_ok=True)
@@ -73,8 +103,9 @@ def reset_complete():
     print("\n💾 Eliminando backups...")
     backup_dir = Path('data/backups')
     if backup_dir.exists():
-        count = len(list(backup_dir.glob('*.db')))
-        shutil.rmtree(backup_dir)
+        with os.scandir(backup_dir) as entries:
+            count = sum(1 for e in entries if e.name.endswith('.db'))
+        shutil.rmtree(backup_dir, ignore_errors=True)
         print(f"   ✅ {count} backups eliminados")
     else:
         print("   ℹ️  No había backups")
@@ -112,7 +143,7 @@ def reset_complete():
     print("📋 Resumen de lo eliminado:")
     print("   ✓ Base de datos (questions.db)")
     print("   ✓ PDFs subidos")
-    print("   ✓ Caché de OCR")
+    print("   ✓ Cachés (OCR, texto extraído, semántica, estadísticas)")
     print("   ✓ Estadísticas exportadas")
     print("   ✓ Backups\n")
     
@@ -127,54 +158,54 @@ def reset_solo_pdfs():
     # Eliminar PDFs
     pdf_dir = Path('data/pdfs')
     if pdf_dir.exists():
-        count = 0
-        for pdf in pdf_dir.glob('*.pdf'):
-            pdf.unlink()
-            count += 1
+        count = _unlink_many(pdf_dir.glob('*.pdf'))
         print(f"✅ {count} PDFs eliminados")
     
     # Limpiar registros de PDFs en la BD
     db_path = Path('data/questions.db')
     if db_path.exists():
-        conn = sqlite3.connect(str(db_path))
-        cursor = conn.cursor()
-        
-        # Contar antes de eliminar
-        cursor.execute("SELECT COUNT(*) FROM pdfs")
-        pdf_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(*) FROM questions")
-        question_count = cursor.fetchone()[0]
-        
-        # Eliminar todo
-        cursor.execute("DELETE FROM questions")
-        cursor.execute("DELETE FROM pdfs")
-        cursor.execute("DELETE FROM game_saves")
-        cursor.execute("DELETE FROM answer_history")
-        
-        conn.commit()
-        conn.close()
+        conn = sqlite3.connect(str(db_path), isolation_level=None)
+        try:
+            # Purga completa: sin comprobaciones de cascada
+            conn.execute("PRAGMA foreign_keys = OFF")
+            
+            # Contar y eliminar en una sola transacción (mismo snapshot)
+            conn.execute("BEGIN IMMEDIATE")
+            pdf_count, question_count = conn.execute(
+                "SELECT (SELECT COUNT(*) FROM pdfs), (SELECT COUNT(*) FROM questions)"
+            ).fetchone()
+            for table in ('answer_history', 'game_saves', 'questions', 'pdfs'):
+                conn.execute(f"DELETE FROM {table}")
+            # Respuestas de la API cacheadas: contienen preguntas de los PDFs eliminados
+            # (la tabla no existe en bases de datos anteriores a la caché)
+            if conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'response_cache'"
+            ).fetchone():
+                conn.execute("DELETE FROM response_cache")
+            conn.execute("COMMIT")
+            
+            conn.execute("PRAGMA foreign_keys = ON")
+            # Recuperar espacio (fuera de la transacción)
+            conn.execute("VACUUM")
+        finally:
+            conn.close()
         
         print(f"✅ {pdf_count} registros de PDFs eliminados")
         print(f"✅ {question_count} preguntas eliminadas")
     
+    # Las cachés guardan texto y preguntas de los PDFs eliminados
+    print("\n🔍 Eliminando cachés...")
+    _purge_caches()
+    
     print("\n✅ PDFs eliminados. Estadísticas y configuración mantenidas.\n")
 
 
 def reset_solo_cache():
-    """Solo limpia caché de OCR"""
+    """Solo limpia las cachés en disco"""
     
-    print("\n🔍 Limpiando solo caché de OCR...\n")
+    print("\n🔍 Limpiando solo cachés...\n")
     
-    ocr_cache_dir = Path('data/ocr_cache')
-    if ocr_cache_dir.exists():
-        count = 0
-        for cache_file in ocr_cache_dir.glob('*.pkl'):
-            cache_file.unlink()
-            count += 1
-        print(f"✅ {count} archivos de caché eliminados")
-    else:
-        print("ℹ️  No había caché para eliminar")
+    _purge_caches()
     
     print("\n✅ Caché limpiado.\n")
 
@@ -193,7 +224,7 @@ def mostrar_menu():
     print("2. 📄 Solo PDFs y preguntas")
     print("   → Mantiene configuración y estructura")
     print()
-    print("3. 🗑️  Solo caché de OCR")
+    print("3. 🗑️  Solo cachés (OCR, texto extraído, semántica, estadísticas)")
     print("   → Limpia caché para reprocesar PDFs")
     print()
     print("4. ❌ Cancelar")
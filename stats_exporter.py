@@ -1,29 +1,245 @@
 """
 Statistics Exporter for Educational Roguelike
-Exports learning statistics in multiple formats (JSON, CSV, Markdown)
+Exports learning statistics in multiple formats (JSON, CSV, Markdown, Parquet)
 """
 
 import json
 import csv
+import hashlib
+import pickle
 from datetime import datetime
-from typing import Dict, List
+from functools import lru_cache, wraps
+from typing import Dict, List, Optional
 from pathlib import Path
 import logging
+import threading
+from collections import Counter
 
 import config
-from database import stats_manager, question_manager, pdf_manager
+from database import stats_manager, pdf_manager
+
+# Import orjson if available (faster JSON export)
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Import pyarrow if available (typed, columnar Parquet export)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Write buffer for streamed exports (CSV rows), instead of the default 8 KiB
+EXPORT_WRITE_BUFFER = 64 * 1024
+
+# Bump when the layout of _gather_all_stats changes, so old cache files are ignored
+STATS_CACHE_VERSION = 1
+
+# Columns of the tabular stats, stored JSON-Tables style:
+# {'__dict_type': 'table', 'cols': [...], 'row_data': [[...], ...]}
+TOPIC_PERFORMANCE_COLS = ['topic', 'attempts', 'correct', 'accuracy']
+WEAK_AREAS_COLS = ['topic', 'difficulty', 'attempts', 'correct', 'accuracy']
+RECENT_ACTIVITY_COLS = ['question_text', 'topic', 'difficulty', 'user_answer', 'is_correct', 'answered_date']
+
+
+class _FilenameSanitizer(dict):
+    """
+    str.translate table keeping alphanumerics, spaces, '-' and '_'
+
+    Filled lazily: each code point is classified the first time it is seen,
+    later lookups are plain dict hits done in C.
+    """
+
+    def __missing__(self, code: int):
+        char = chr(code)
+        self[code] = kept = char if char.isalnum() or char in ' -_' else None
+        return kept
+
+
+_FILENAME_SANITIZER = _FilenameSanitizer()
+
+# Markdown table rows, parsed once instead of per row
+TOPIC_ROW_FMT = "| {topic} | {attempts} | {correct} | {accuracy:.1f}% {bar} |\n"
+WEAK_AREA_ROW_FMT = "| {topic} | {difficulty} | {accuracy:.1f}% |\n"
+
+# Every possible default-length progress bar, indexed by filled cells
+BAR_LENGTH = 10
+_BAR_CACHE = [f"`{'█' * i}{'░' * (BAR_LENGTH - i)}`" for i in range(BAR_LENGTH + 1)]
+
+
+# Value of the 'format' key of JSON-Tables exports (the default layout has no such key)
+JSON_FORMAT_TABLES = 'json_tables'
+
+
+def _table(cols: List[str], row_data: List[list]) -> Dict:
+    """Build a JSON-Tables block (field names stored once, not per row)"""
+    return {'__dict_type': 'table', 'cols': cols, 'row_data': row_data}
+
+
+def _table_to_dicts(table: Dict) -> List[Dict]:
+    """Expand a JSON-Tables block into one dict per row (the default JSON layout)"""
+    cols = table['cols']
+    return [dict(zip(cols, row)) for row in table['row_data']]
+
+
+@lru_cache(maxsize=128)
+def _format_time(seconds: int) -> str:
+    """Format seconds into human-readable time"""
+    if not seconds:
+        return "0 minutes"
+
+    hours = seconds // 3600
+    minutes = (seconds % 3600) // 60
+    secs = seconds % 60
+
+    parts = []
+    if hours > 0:
+        parts.append(f"{hours}h")
+    if minutes > 0:
+        parts.append(f"{minutes}m")
+    if secs > 0 and hours == 0:
+        parts.append(f"{secs}s")
+
+    return " ".join(parts) if parts else "0s"
+
+
+# Accuracy buckets: (upper bound, exclusive), value; looked up with _accuracy_bucket
+
+# LearningAnalyzer study recommendations
+RECOMMENDATIONS_BY_ACCURACY = (
+    (50, ("Start with easier questions to build confidence",
+          "Review the source material before playing")),
+    (70, ("Focus on weak topics identified above",
+          "Take time to read explanations for wrong answers")),
+    (float('inf'), ("Challenge yourself with harder difficulties",
+                    "Try to complete a full game without errors")),
+)
+
+# Markdown report: performance line and study recommendations
+REPORT_FEEDBACK_BY_ACCURACY = (
+    (60, ("📚 Keep studying!", (
+        "- 📖 Review fundamental concepts\n",
+        "- 🎯 Focus on accuracy over speed\n",
+        "- 🔄 Repeat challenging topics\n",
+    ))),
+    (80, ("👍 Good job!", (
+        "- 🎯 Good progress! Keep practicing\n",
+        "- 📊 Focus on weak areas identified above\n",
+        "- 🧠 Try harder difficulty questions\n",
+    ))),
+    (float('inf'), ("🌟 Excellent!", (
+        "- 🌟 Excellent mastery!\n",
+        "- 🚀 Challenge yourself with advanced topics\n",
+        "- 📝 Consider teaching others to reinforce learning\n",
+    ))),
+)
+
+
+def _accuracy_bucket(buckets: tuple, accuracy: float):
+    """Look up the value of the bucket accuracy falls in"""
+    return next(value for upper, value in buckets if accuracy < upper)
+
+
+@lru_cache(maxsize=128)
+def _assess_level(accuracy: float) -> str:
+    """Assess learning level based on accuracy"""
+    if accuracy >= 90:
+        return "Expert"
+    elif accuracy >= 80:
+        return "Advanced"
+    elif accuracy >= 70:
+        return "Intermediate"
+    elif accuracy >= 60:
+        return "Beginner"
+    else:
+        return "Novice"
+
+
+if PYARROW_AVAILABLE:
+    # Gathered stats tables written to Parquet, one file each
+    PARQUET_SCHEMAS = {
+        'topic_performance': pa.schema([
+            ('topic', pa.string()),
+            ('attempts', pa.int64()),
+            ('correct', pa.int64()),
+            ('accuracy', pa.float64()),
+        ]),
+        'recent_activity': pa.schema([
+            ('question_text', pa.string()),
+            ('topic', pa.string()),
+            ('difficulty', pa.string()),
+            ('user_answer', pa.string()),
+            ('is_correct', pa.bool_()),
+            ('answered_date', pa.string()),
+        ]),
+    }
+
+
+# Exports per format, failures ('<format>_errors') and stats cache hits/misses, see StatsExporter.get_stats()
+_EXPORT_COUNTS = Counter()
+_EXPORT_COUNTS_LOCK = threading.Lock()
+
+
+def _count(key: str):
+    """Bump one export counter"""
+    with _EXPORT_COUNTS_LOCK:
+        _EXPORT_COUNTS[key] += 1
+
+
+def _counted(fmt: str):
+    """Count successful and failed calls of an export method under fmt"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(*args, **kwargs):
+            try:
+                result = method(*args, **kwargs)
+            except Exception:
+                _count(f"{fmt}_errors")
+                raise
+            _count(fmt)
+            return result
+        return wrapper
+    return decorator
+
+
+def _pinned_export_time(method):
+    """Capture datetime.now() once per export so every filename and date in it match"""
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._export_time is not None:  # Nested inside another export
+            return method(self, *args, **kwargs)
+        self._export_time = datetime.now()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._export_time = None
+    return wrapper
+
 
 class StatsExporter:
     """Export statistics in various formats"""
 
-    def __init__(self, pdf_id: int):
+    def __init__(self, pdf_id: int, json_tables: bool = False):
         self.pdf_id = pdf_id
         self.export_dir = config.EXPORT_DIR
+        self._export_time = None  # Set while an export runs, see _pinned_export_time
+        # Write JSON tables as cols + row_data instead of one dict per row (see export_json)
+        self.json_tables = json_tables
+
+    @classmethod
+    def get_stats(cls) -> Dict[str, int]:
+        """Snapshot of the export counters of this process (per format, errors, cache hits)"""
+        with _EXPORT_COUNTS_LOCK:
+            return dict(_EXPORT_COUNTS)
 
+    @_pinned_export_time
     def export_all_formats(self, filename_base: str = None) -> Dict[str, str]:
         """
         Export statistics in all available formats
@@ -34,17 +250,20 @@ class StatsExporter:
         if not filename_base:
             pdf_info = pdf_manager.get_pdf(self.pdf_id)
             pdf_title = pdf_info['title'] if pdf_info else f"pdf_{self.pdf_id}"
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            timestamp = self._export_now().strftime('%Y%m%d_%H%M%S')
             filename_base = f"{pdf_title}_{timestamp}"
 
         # Sanitize filename
-        filename_base = "".join(c for c in filename_base if c.isalnum() or c in (' ', '-', '_')).strip()
+        filename_base = filename_base.translate(_FILENAME_SANITIZER).strip()
 
         results = {}
 
+        # Query the stats once and share them between all formats
+        data = self._gather_all_stats()
+
         # Export JSON
         try:
-            json_path = self.export_json(filename_base)
+            json_path = self.export_json(filename_base, data, pretty=False)
             results['json'] = json_path
             logger.info(f"Exported JSON to {json_path}")
         except Exception as e:
@@ -60,100 +279,217 @@ class StatsExporter:
 
         # Export Markdown
         try:
-            md_path = self.export_markdown(filename_base)
+            md_path = self.export_markdown(filename_base, data)
             results['markdown'] = md_path
             logger.info(f"Exported Markdown to {md_path}")
         except Exception as e:
             logger.error(f"Markdown export failed: {str(e)}")
 
+        # Export Parquet (optional dependency)
+        if PYARROW_AVAILABLE:
+            try:
+                parquet_paths = self.export_parquet(filename_base, data)
+                results['parquet'] = parquet_paths
+                logger.info(f"Exported Parquet to {', '.join(parquet_paths.values())}")
+            except Exception as e:
+                logger.error(f"Parquet export failed: {str(e)}")
+
         return results
 
-    def export_json(self, filename: str = None) -> str:
-        """Export complete statistics as JSON"""
-        data = self._gather_all_stats()
+    @_counted('json')
+    @_pinned_export_time
+    def export_json(self, filename: str = None, data: Dict = None, pretty: bool = False) -> str:
+        """
+        Export complete statistics as JSON (data: pre-gathered stats, queried if None)
+
+        Compact by default (meant for tools); pretty=True indents it for humans.
+        Tables (topic_performance, weak_areas, recent_activity) are lists of one
+        dict per row, unless the exporter was created with json_tables=True:
+        then each is {'__dict_type': 'table', 'cols': [...], 'row_data': [[...]]}.
+        and the top-level 'format' key is 'json_tables'. The default output has
+        no 'format' key, so it stays identical to the original layout.
+        """
+        if data is None:
+            data = self._gather_all_stats()
 
         if not filename:
-            filename = f"stats_{self.pdf_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            filename = f"stats_{self.pdf_id}_{self._export_now().strftime('%Y%m%d_%H%M%S')}"
 
         filepath = self.export_dir / f"{filename}.json"
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        if self.json_tables:
+            data = {'format': JSON_FORMAT_TABLES, **data}
+        else:
+            data = {
+                key: _table_to_dicts(value) if isinstance(value, dict) and value.get('__dict_type') == 'table' else value
+                for key, value in data.items()
+            }
+
+        if ORJSON_AVAILABLE:
+            # orjson emits UTF-8 bytes directly
+            option = orjson.OPT_NON_STR_KEYS | orjson.OPT_APPEND_NEWLINE
+            if pretty:
+                option |= orjson.OPT_INDENT_2
+            with open(filepath, 'wb') as f:
+                f.write(orjson.dumps(data, option=option))
+        else:
+            # json.dump writes one small chunk per token; serialize first and write once
+            if pretty:
+                text = json.dumps(data, indent=2, ensure_ascii=False)
+            else:
+                text = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+            filepath.write_text(text + "\n", encoding='utf-8')
 
         return str(filepath)
 
+    def export_json_pretty(self, filename: str = None, data: Dict = None) -> str:
+        """Export complete statistics as indented, human-readable JSON"""
+        return self.export_json(filename, data, pretty=True)
+
+    @_counted('csv')
+    @_pinned_export_time
     def export_csv(self, filename: str = None) -> str:
         """Export statistics as CSV"""
         if not filename:
-            filename = f"stats_{self.pdf_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            filename = f"stats_{self.pdf_id}_{self._export_now().strftime('%Y%m%d_%H%M%S')}"
 
         filepath = self.export_dir / f"{filename}.csv"
 
-        # Get topic performance data
-        topic_performance = stats_manager.get_topic_performance(self.pdf_id)
-
-        with open(filepath, 'w', newline='', encoding='utf-8') as f:
-            if not topic_performance:
-                # Write empty file with headers
-                writer = csv.writer(f)
-                writer.writerow(['Topic', 'Attempts', 'Correct', 'Accuracy (%)'])
-                return str(filepath)
-
-            fieldnames = ['Topic', 'Attempts', 'Correct', 'Accuracy (%)']
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-
-            writer.writeheader()
-            for topic in topic_performance:
-                writer.writerow({
-                    'Topic': topic.get('topic', 'Unknown'),
-                    'Attempts': topic.get('attempts', 0),
-                    'Correct': topic.get('correct', 0),
-                    'Accuracy (%)': f"{topic.get('accuracy', 0):.1f}"
-                })
+        with open(filepath, 'w', newline='', encoding='utf-8', buffering=EXPORT_WRITE_BUFFER) as f:
+            writer = csv.writer(f)
+            writer.writerow(stats_manager.TOPIC_PERFORMANCE_HEADER)
+            # Rows come straight from SQL, accuracy already formatted
+            writer.writerows(stats_manager.iter_topic_performance_rows(self.pdf_id))
 
         return str(filepath)
 
-    def export_markdown(self, filename: str = None) -> str:
-        """Export statistics as formatted Markdown report"""
+    @_counted('markdown')
+    @_pinned_export_time
+    def export_markdown(self, filename: str = None, data: Dict = None) -> str:
+        """Export statistics as formatted Markdown report (data: pre-gathered stats, queried if None)"""
         if not filename:
-            filename = f"report_{self.pdf_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+            filename = f"report_{self.pdf_id}_{self._export_now().strftime('%Y%m%d_%H%M%S')}"
 
         filepath = self.export_dir / f"{filename}.md"
 
         # Gather all stats
-        data = self._gather_all_stats()
+        if data is None:
+            data = self._gather_all_stats()
 
         # Build markdown report
         report = self._build_markdown_report(data)
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(report)
+        filepath.write_text(report, encoding='utf-8')
 
         return str(filepath)
 
+    @_counted('parquet')
+    @_pinned_export_time
+    def export_parquet(self, filename: str = None, data: Dict = None) -> Dict[str, str]:
+        """
+        Export topic performance and recent activity as zstd-compressed Parquet
+
+        Returns:
+            Dict mapping table name to filepath
+        """
+        if not PYARROW_AVAILABLE:
+            raise RuntimeError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        if data is None:
+            data = self._gather_all_stats()
+
+        if not filename:
+            filename = f"stats_{self.pdf_id}_{self._export_now().strftime('%Y%m%d_%H%M%S')}"
+
+        paths = {}
+        for table_name, schema in PARQUET_SCHEMAS.items():
+            stats_table = data[table_name]
+            columns = dict(zip(stats_table['cols'], map(list, zip(*stats_table['row_data']))))
+            # Cast column by column (SQLite hands back is_correct as 0/1)
+            table = pa.table({
+                field.name: pa.array(columns.get(field.name, [])).cast(field.type)
+                for field in schema
+            })
+            filepath = self.export_dir / f"{filename}_{table_name}.parquet"
+            pq.write_table(table, filepath, compression='zstd')
+            paths[table_name] = str(filepath)
+
+        return paths
+
+    def _export_now(self) -> datetime:
+        """Time of the export in progress (now, outside of one)"""
+        return self._export_time or datetime.now()
+
     def _gather_all_stats(self) -> Dict:
-        """Gather all statistics for export"""
-        # Get PDF info
-        pdf_info = pdf_manager.get_pdf(self.pdf_id)
+        """Gather all statistics for export (from the disk cache while nothing changed)"""
+        cache_file = self._stats_cache_file()
+        data = self._load_stats_cache(cache_file)
+
+        if data is None:
+            _count('cache_misses')
+            data = self._query_all_stats()
+            self._save_stats_cache(cache_file, data)
+        else:
+            _count('cache_hits')
 
-        # Get overall stats
-        overall = stats_manager.get_overall_stats(self.pdf_id)
+        data['export_date'] = self._export_now().isoformat()
+        return data
 
-        # Get topic performance
-        topic_performance = stats_manager.get_topic_performance(self.pdf_id)
+    def _stats_cache_file(self) -> Optional[Path]:
+        """Cache file for the current state of this PDF's stats (None if caching is off)"""
+        if not config.STATS_CACHE_ENABLED:
+            return None
 
-        # Get weak areas
-        weak_areas = stats_manager.get_weak_areas(self.pdf_id)
+        fingerprint = (STATS_CACHE_VERSION, self.pdf_id) + stats_manager.get_export_fingerprint(self.pdf_id)
+        digest = hashlib.blake2b(repr(fingerprint).encode(), digest_size=16).hexdigest()
+        return config.STATS_CACHE_DIR / f"stats_{self.pdf_id}_{digest}.pkl"
 
-        # Get recent activity
-        recent_activity = stats_manager.get_recent_activity(self.pdf_id, limit=50)
+    def _load_stats_cache(self, cache_file: Optional[Path]) -> Optional[Dict]:
+        """Load gathered stats from cache"""
+        if cache_file is None or not cache_file.exists():
+            return None
 
-        # Question count and topics
-        question_count = question_manager.get_question_count(self.pdf_id)
-        questions_by_topic = question_manager.get_questions_by_topic(self.pdf_id)
+        try:
+            with open(cache_file, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logger.warning(f"Stats cache load failed: {e}")
+            return None
+
+    def _save_stats_cache(self, cache_file: Optional[Path], data: Dict):
+        """Save gathered stats to cache, dropping all but the newest STATS_CACHE_KEEP files of this PDF"""
+        if cache_file is None:
+            return
+
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(cache_file, 'wb') as f:
+                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+            old_files = sorted(
+                cache_file.parent.glob(f"stats_{self.pdf_id}_*.pkl"),
+                key=lambda path: path.stat().st_mtime,
+                reverse=True
+            )[config.STATS_CACHE_KEEP:]
+            for path in old_files:
+                path.unlink(missing_ok=True)
+        except Exception as e:
+            logger.warning(f"Stats cache save failed: {e}")
+
+    def _query_all_stats(self) -> Dict:
+        """Query all statistics for export from the database"""
+        # One connection and one read transaction for every query
+        bundle = stats_manager.get_export_bundle(self.pdf_id, recent_limit=20)  # Only the last 20 answers are exported
+        pdf_info = bundle['pdf_info']
+        overall = bundle['overall']
+        topic_performance = bundle['topics']
+        weak_areas = bundle['weak']
+        recent_activity = bundle['recent']
+        question_count = bundle['question_count']
+        questions_by_topic = bundle['questions_by_topic']
 
         return {
-            'export_date': datetime.now().isoformat(),
+            'export_date': self._export_now().isoformat(),
             'pdf_info': {
                 'id': self.pdf_id,
                 'title': pdf_info['title'] if pdf_info else f"PDF {self.pdf_id}",
@@ -174,49 +510,49 @@ class StatsExporter:
                 'total_questions': question_count,
                 'questions_by_topic': questions_by_topic
             },
-            'topic_performance': [
-                {
-                    'topic': t.get('topic', 'Unknown'),
-                    'attempts': t.get('attempts', 0),
-                    'correct': t.get('correct', 0),
-                    'accuracy': round(t.get('accuracy', 0), 2)
-                }
+            'topic_performance': _table(TOPIC_PERFORMANCE_COLS, [
+                [
+                    t.get('topic', 'Unknown'),
+                    t.get('attempts', 0),
+                    t.get('correct', 0),
+                    round(t.get('accuracy', 0), 2)
+                ]
                 for t in topic_performance
-            ],
-            'weak_areas': [
-                {
-                    'topic': w.get('topic', 'Unknown'),
-                    'difficulty': w.get('difficulty', 'unknown'),
-                    'attempts': w.get('attempts', 0),
-                    'correct': w.get('correct', 0),
-                    'accuracy': round(w.get('accuracy', 0), 2)
-                }
+            ]),
+            'weak_areas': _table(WEAK_AREAS_COLS, [
+                [
+                    w.get('topic', 'Unknown'),
+                    w.get('difficulty', 'unknown'),
+                    w.get('attempts', 0),
+                    w.get('correct', 0),
+                    round(w.get('accuracy', 0), 2)
+                ]
                 for w in weak_areas
-            ],
-            'recent_activity': [
-                {
-                    'question_text': a.get('question_text', ''),
-                    'topic': a.get('topic', 'Unknown'),
-                    'difficulty': a.get('difficulty', 'unknown'),
-                    'user_answer': a.get('user_answer', ''),
-                    'is_correct': a.get('is_correct', False),
-                    'answered_date': a.get('answered_date', '')
-                }
-                for a in recent_activity[:20]  # Limit to last 20
-            ]
+            ]),
+            'recent_activity': _table(RECENT_ACTIVITY_COLS, [
+                [
+                    a.get('question_text', ''),
+                    a.get('topic', 'Unknown'),
+                    a.get('difficulty', 'unknown'),
+                    a.get('user_answer', ''),
+                    a.get('is_correct', False),
+                    a.get('answered_date', '')
+                ]
+                for a in recent_activity
+            ])
         }
 
     def _build_markdown_report(self, data: Dict) -> str:
         """Build a formatted Markdown report"""
         pdf_info = data['pdf_info']
         overall = data['overall_stats']
-        topics = data['topic_performance']
-        weak = data['weak_areas']
+        topics = data['topic_performance']['row_data']
+        weak = data['weak_areas']['row_data']
 
-        report = f"""# 📊 Learning Statistics Report
+        parts = [f"""# 📊 Learning Statistics Report
 
 **PDF:** {pdf_info['title']}
-**Generated:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
+**Generated:** {self._export_now().strftime('%Y-%m-%d %H:%M:%S')}
 
 ---
 
@@ -231,92 +567,64 @@ class StatsExporter:
 | **Total Score** | {overall['total_score']:,} |
 | **Games Completed** | {overall['completed_games']} |
 
-"""
+"""]
 
         # Progress bar for accuracy
-        accuracy = overall['accuracy_percent']
-        if accuracy >= 80:
-            emoji = "🌟"
-            comment = "Excellent!"
-        elif accuracy >= 60:
-            emoji = "👍"
-            comment = "Good job!"
-        else:
-            emoji = "📚"
-            comment = "Keep studying!"
+        performance, recommendations = _accuracy_bucket(
+            REPORT_FEEDBACK_BY_ACCURACY, overall['accuracy_percent']
+        )
 
-        report += f"**Performance:** {emoji} {comment}\n\n---\n\n"
+        parts.append(f"**Performance:** {performance}\n\n---\n\n")
 
         # Topic Performance
         if topics:
-            report += "## 📚 Performance by Topic\n\n"
-            report += "| Topic | Attempts | Correct | Accuracy |\n"
-            report += "|-------|----------|---------|----------|\n"
+            parts.append("## 📚 Performance by Topic\n\n")
+            parts.append("| Topic | Attempts | Correct | Accuracy |\n")
+            parts.append("|-------|----------|---------|----------|\n")
 
-            for topic in topics:
-                accuracy_bar = self._create_bar(topic['accuracy'], 100)
-                report += f"| {topic['topic']} | {topic['attempts']} | {topic['correct']} | {topic['accuracy']:.1f}% {accuracy_bar} |\n"
+            for topic, attempts, correct, topic_accuracy in topics:
+                parts.append(TOPIC_ROW_FMT.format(
+                    topic=topic, attempts=attempts, correct=correct, accuracy=topic_accuracy,
+                    bar=self._create_bar(topic_accuracy, 100)
+                ))
 
-            report += "\n---\n\n"
+            parts.append("\n---\n\n")
 
         # Weak Areas
         if weak:
-            report += "## ⚠️ Areas Needing Improvement\n\n"
-            report += "Focus your study on these topics:\n\n"
-            report += "| Topic | Difficulty | Accuracy |\n"
-            report += "|-------|------------|----------|\n"
+            parts.append("## ⚠️ Areas Needing Improvement\n\n")
+            parts.append("Focus your study on these topics:\n\n")
+            parts.append("| Topic | Difficulty | Accuracy |\n")
+            parts.append("|-------|------------|----------|\n")
 
-            for area in weak[:5]:  # Top 5 weak areas
-                report += f"| {area['topic']} | {area['difficulty'].capitalize()} | {area['accuracy']:.1f}% |\n"
+            for topic, difficulty, _, _, area_accuracy in weak[:5]:  # Top 5 weak areas
+                parts.append(WEAK_AREA_ROW_FMT.format(
+                    topic=topic, difficulty=difficulty.capitalize(), accuracy=area_accuracy
+                ))
 
-            report += "\n---\n\n"
+            parts.append("\n---\n\n")
 
         # Study Recommendations
-        report += "## 💡 Study Recommendations\n\n"
-
-        if overall['accuracy_percent'] < 60:
-            report += "- 📖 Review fundamental concepts\n"
-            report += "- 🎯 Focus on accuracy over speed\n"
-            report += "- 🔄 Repeat challenging topics\n"
-        elif overall['accuracy_percent'] < 80:
-            report += "- 🎯 Good progress! Keep practicing\n"
-            report += "- 📊 Focus on weak areas identified above\n"
-            report += "- 🧠 Try harder difficulty questions\n"
-        else:
-            report += "- 🌟 Excellent mastery!\n"
-            report += "- 🚀 Challenge yourself with advanced topics\n"
-            report += "- 📝 Consider teaching others to reinforce learning\n"
+        parts.append("## 💡 Study Recommendations\n\n")
+        parts.extend(recommendations)
 
-        report += "\n---\n\n"
+        parts.append("\n---\n\n")
 
         # Footer
-        report += f"*Report generated by Educational Roguelike Game*  \n"
-        report += f"*Export Date: {data['export_date']}*\n"
+        parts.append(f"*Report generated by Educational Roguelike Game*  \n")
+        parts.append(f"*Export Date: {data['export_date']}*\n")
 
-        return report
+        return "".join(parts)
 
     def _format_time(self, seconds: int) -> str:
         """Format seconds into human-readable time"""
-        if not seconds:
-            return "0 minutes"
-
-        hours = seconds // 3600
-        minutes = (seconds % 3600) // 60
-        secs = seconds % 60
-
-        parts = []
-        if hours > 0:
-            parts.append(f"{hours}h")
-        if minutes > 0:
-            parts.append(f"{minutes}m")
-        if secs > 0 and hours == 0:
-            parts.append(f"{secs}s")
-
-        return " ".join(parts) if parts else "0s"
+        return _format_time(seconds)
 
     def _create_bar(self, value: float, max_value: float, length: int = 10) -> str:
         """Create a text-based progress bar"""
         filled = int((value / max_value) * length)
+        if length == BAR_LENGTH and 0 <= filled <= BAR_LENGTH:
+            return _BAR_CACHE[filled]
         bar = "█" * filled + "░" * (length - filled)
         return f"`{bar}`"
 
@@ -357,15 +665,7 @@ class LearningAnalyzer:
             ]
 
         # Generate recommendations
-        if overall['accuracy'] < 50:
-            insights['recommendations'].append("Start with easier questions to build confidence")
-            insights['recommendations'].append("Review the source material before playing")
-        elif overall['accuracy'] < 70:
-            insights['recommendations'].append("Focus on weak topics identified above")
-            insights['recommendations'].append("Take time to read explanations for wrong answers")
-        else:
-            insights['recommendations'].append("Challenge yourself with harder difficulties")
-            insights['recommendations'].append("Try to complete a full game without errors")
+        insights['recommendations'] = list(_accuracy_bucket(RECOMMENDATIONS_BY_ACCURACY, overall['accuracy']))
 
         if insights['weak_topics']:
             insights['recommendations'].append(f"Extra study needed: {', '.join(insights['weak_topics'][:2])}")
@@ -374,16 +674,7 @@ class LearningAnalyzer:
 
     def _assess_level(self, accuracy: float) -> str:
         """Assess learning level based on accuracy"""
-        if accuracy >= 90:
-            return "Expert"
-        elif accuracy >= 80:
-            return "Advanced"
-        elif accuracy >= 70:
-            return "Intermediate"
-        elif accuracy >= 60:
-            return "Beginner"
-        else:
-            return "Novice"
+        return _assess_level(accuracy)
 
     def suggest_next_questions(self, limit: int = 5) -> List[Dict]:
         """
@@ -419,18 +710,19 @@ class LearningAnalyzer:
 # 🚀 UTILITY FUNCTIONS
 # ═══════════════════════════════════════════════════════════════════
 
-def export_stats_for_pdf(pdf_id: int, format: str = 'all') -> Dict:
+def export_stats_for_pdf(pdf_id: int, format: str = 'all', json_tables: bool = False) -> Dict:
     """
     Quick export function
 
     Args:
         pdf_id: PDF ID
-        format: 'json', 'csv', 'markdown', or 'all'
+        format: 'json', 'csv', 'markdown', 'parquet', or 'all'
+        json_tables: Write JSON tables as cols + row_data instead of one dict per row
 
     Returns:
         Dict with export paths
     """
-    exporter = StatsExporter(pdf_id)
+    exporter = StatsExporter(pdf_id, json_tables=json_tables)
 
     if format == 'all':
         return exporter.export_all_formats()
@@ -440,5 +732,7 @@ def export_stats_for_pdf(pdf_id: int, format: str = 'all') -> Dict:
         return {'csv': exporter.export_csv()}
     elif format == 'markdown':
         return {'markdown': exporter.export_markdown()}
+    elif format == 'parquet':
+        return {'parquet': exporter.export_parquet()}
     else:
         raise ValueError(f"Unknown format: {format}")
@@ -0,0 +1,18 @@
+"""
+Tests for database helpers
+"""
+
+import pytest
+
+from database import decode_options, encode_options
+
+
+@pytest.mark.parametrize('options', [
+    [],
+    [''],
+    ['true', 'false'],
+    ['A', 'B', 'C', 'D'],
+    ['with \x1f separator', 'B'],
+])
+def test_options_round_trip(options):
+    assert decode_options(encode_options(options)) == options
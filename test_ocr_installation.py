@@ -4,8 +4,8 @@ Script de Prueba Rápida - Educational Roguelike OCR
 Verifica la instalación y funcionalidad de OCR
 """
 
+import shutil
 import sys
-from pathlib import Path
 
 print("=" * 70)
 print("🔍 VERIFICACIÓN DE INSTALACIÓN - OCR SUPPORT")
@@ -81,30 +81,21 @@ print()
 
 tesseract_installed = False
 tesseract_version = None
+available_langs = []
 
 try:
     import pytesseract
-    import subprocess
     
-    # Intentar ejecutar tesseract
-    try:
-        result = subprocess.run(
-            ['tesseract', '--version'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
-        if result.returncode == 0:
+    # Buscar el ejecutable en PATH (sin lanzar procesos)
+    if shutil.which(pytesseract.pytesseract.tesseract_cmd):
+        try:
+            # pytesseract cachea la versión para el resto del script
+            tesseract_version = str(pytesseract.get_tesseract_version())
             tesseract_installed = True
-            # Extraer versión
-            version_line = result.stdout.split('\n')[0]
-            tesseract_version = version_line.replace('tesseract ', '')
             print(f"✅ Tesseract instalado: {tesseract_version}")
-        else:
+        except Exception:
             print("❌ Tesseract NO responde correctamente")
-            
-    except FileNotFoundError:
+    else:
         print("❌ Tesseract NO encontrado en PATH")
         print()
         print("Instalar Tesseract:")
@@ -121,15 +112,10 @@ if tesseract_installed:
     print()
     print("Verificando idiomas instalados...")
     try:
-        result = subprocess.run(
-            ['tesseract', '--list-langs'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
+        langs = pytesseract.get_languages(config='')
+        available_langs = langs
         
-        if result.returncode == 0:
-            langs = result.stdout.strip().split('\n')[1:]  # Skip first line
+        if langs:
             print(f"Idiomas disponibles: {', '.join(langs)}")
             
             # Verificar idiomas clave
@@ -166,22 +152,13 @@ print()
 poppler_installed = False
 
 try:
-    import subprocess
+    # Buscar pdftoppm (parte de poppler) en PATH, que es lo que usa pdf2image
+    pdftoppm_path = shutil.which('pdftoppm')
     
-    # Intentar ejecutar pdftoppm (parte de poppler)
-    try:
-        result = subprocess.run(
-            ['pdftoppm', '-v'],
-            capture_output=True,
-            text=True,
-            timeout=5
-        )
-        
+    if pdftoppm_path:
         poppler_installed = True
-        version_info = result.stderr.strip().split('\n')[0] if result.stderr else "Versión desconocida"
-        print(f"✅ Poppler instalado: {version_info}")
-        
-    except FileNotFoundError:
+        print(f"✅ Poppler instalado: {pdftoppm_path}")
+    else:
         print("❌ Poppler NO encontrado")
         print()
         print("Instalar Poppler:")
@@ -209,8 +186,14 @@ if not missing_packages and tesseract_installed:
     
     try:
         from PIL import Image, ImageDraw, ImageFont
-        import pytesseract
-        import tempfile
+        from ocr_worker import ocr_images
+        
+        # Calentar Tesseract una sola vez (carga los traineddata) antes de las pruebas
+        warmup_lang = '+'.join(lang for lang in ('eng', 'spa') if lang in available_langs) or 'eng'
+        try:
+            ocr_images([Image.new('L', (50, 20), 255)], lang=warmup_lang, max_workers=1)
+        except Exception:
+            pass
         
         # Crear imagen de prueba
         img = Image.new('RGB', (400, 100), color='white')
@@ -226,21 +209,13 @@ if not missing_packages and tesseract_installed:
         
         draw.text((10, 30), "Educational Roguelike Test", fill='black', font=font)
         
-        # Guardar temporalmente
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as tmp:
-            img.save(tmp.name)
-            tmp_path = tmp.name
-        
-        # Intentar OCR
-        extracted_text = pytesseract.image_to_string(img, lang='eng')
+        # Intentar OCR (mismo camino que el pool de ocr_worker, con un solo worker)
+        extracted_text = ocr_images([img], lang='eng', max_workers=1)[0]
         
         print("✅ OCR funcional!")
         print(f"   Texto extraído: '{extracted_text.strip()}'")
         print()
         
-        # Limpiar
-        Path(tmp_path).unlink()
-        
     except Exception as e:
         print(f"❌ Error en prueba de OCR: {e}")
         print()
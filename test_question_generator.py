@@ -0,0 +1,49 @@
+"""
+Tests for question validation
+The pydantic model and the dict-based checks must accept and clean questions identically
+"""
+
+import copy
+
+import pytest
+
+import question_generator
+from question_generator import QuestionGenerator
+
+pytest.importorskip('pydantic')
+
+QUESTIONS = [
+    # Answer and options differ only by surrounding whitespace
+    {'question_text': 'Q1?', 'question_type': 'multiple_choice', 'correct_answer': ' A ',
+     'options': ['A', 'B'], 'explanation': 'e'},
+    {'question_text': 'Q2?', 'question_type': 'multiple_choice', 'correct_answer': 'A',
+     'options': [' A', 'B '], 'explanation': 'e', 'topic': 'T', 'difficulty': 'hard'},
+    {'question_text': ' Q3? ', 'question_type': 'true_false', 'correct_answer': ' True ',
+     'explanation': ' e ', 'difficulty': 'unknown'},
+    # Invalid: answer not among the options, blank text, single option, bad type
+    {'question_text': 'Q4?', 'question_type': 'multiple_choice', 'correct_answer': 'C',
+     'options': ['A', 'B'], 'explanation': 'e'},
+    {'question_text': '   ', 'question_type': 'true_false', 'correct_answer': 'false',
+     'explanation': 'e'},
+    {'question_text': 'Q6?', 'question_type': 'multiple_choice', 'correct_answer': 'A',
+     'options': ['A'], 'explanation': 'e'},
+    {'question_text': 'Q7?', 'question_type': 'essay', 'correct_answer': 'A',
+     'explanation': 'e'},
+]
+
+
+def _validate(monkeypatch, use_pydantic: bool):
+    monkeypatch.setattr(question_generator, 'PYDANTIC_AVAILABLE', use_pydantic)
+    generator = QuestionGenerator.__new__(QuestionGenerator)  # No API client needed
+    return generator._validate_questions(copy.deepcopy(QUESTIONS))
+
+
+def test_pydantic_and_dict_validation_agree(monkeypatch):
+    legacy = _validate(monkeypatch, use_pydantic=False)
+    compiled = _validate(monkeypatch, use_pydantic=True)
+
+    assert compiled == legacy
+    assert [q['question_text'] for q in legacy] == ['Q1?', 'Q2?', 'Q3?']
+    assert legacy[0]['correct_answer'] in legacy[0]['options']
+    assert legacy[1]['options'] == ['A', 'B']
+    assert legacy[2]['correct_answer'] == 'true'